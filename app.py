@@ -1,27 +1,80 @@
 import gradio as gr
 import os
-from src.crew import CustomerSupportCrew
-from src.logger import setup_logging
+from src import warmup
+from src.memory import MEMORY_LOOKUP_BUDGET, memory_store
+from src.metrics import RequestTrace, readiness, start_metrics_server
+from src.scheduler import BUSY_MESSAGE, SchedulerBusy, scheduler
+from src.validators import visible_text
+from src.logger import log_context, setup_logging
 from src.css import APP_CSS
-import base64
 
 logger = setup_logging()
 
-# Function to encode image to base64
-def get_base64_image(image_path):
-    if os.path.exists(image_path):
-        with open(image_path, "rb") as img_file:
-            return base64.b64encode(img_file.read()).decode('utf-8')
-    return ""
+# crewai, langchain and faiss are imported by the background warm-up (src/warmup.py), not here,
+# so the UI is up while they load
 
-logo_base64 = get_base64_image("logo.png")
-logo_img_src = f"data:image/png;base64,{logo_base64}" if logo_base64 else "/file=logo.png"
+# The logo is served as a static file (cacheable by the browser) instead of inlined as base64
+LOGO_PATH = "logo.png"
+gr.set_static_paths(paths=[LOGO_PATH])
+logo_img_src = f"/gradio_api/file={LOGO_PATH}"
 
 # Greeting Message
 INITIAL_GREETING = """👋 **Hi there! I'm PulseAI.**
 To get started, are you an existing customer? If so, please share your **Name and Email** so I can access your account.
 """
 
+def answer_query(message, history, on_event=None, session_id=None):
+    """
+    Produces the assistant's reply to message; history already ends with it.
+    With on_event, progress and response chunks are reported as they happen (see CustomerSupportCrew.run).
+    """
+    with log_context(session_id=session_id):
+        logger.info(f"Received query: {message}")
+        # Already imported by the warm-up; a request that beats it waits for that import, not a second one
+        from src.crew import CustomerSupportCrew
+        from src.response_cache import cached_response, remember_response
+        from src.router import ROUTE_FULL, classify_route
+        memory = memory_store.get(session_id, history[:-1])
+        # Closing, out-of-scope and greeting turns have cheaper answers than an embedding call;
+        # only questions for the full crew consult (and fill) the semantic cache
+        route = classify_route(message)
+        cacheable = route == ROUTE_FULL
+        cached = cached_response(message, history[:-1], session_id) if cacheable else None
+        crew = None
+        if cached is not None:
+            trace = RequestTrace(session_id)
+            trace.add_cache("response", True)
+            trace.finish("response_cache")
+            if on_event:
+                on_event("token", cached)
+            result = cached
+        else:
+            # The response agent gets the full token-budgeted context; intent and retrieval only the last exchange
+            crew = CustomerSupportCrew(
+                memory.context(message),
+                message=message,
+                session_id=session_id,
+                lookup_query=memory.context(message, MEMORY_LOOKUP_BUDGET, max_recent=2, summary=False),
+                route=route,
+            )
+            if cacheable:
+                crew.trace.add_cache("response", False)
+            result = str(crew.run(on_event=on_event))
+            if cacheable:
+                remember_response(message, history[:-1], result, session_id)
+
+        if "[CLOSE_CHAT]" in result:
+            memory_store.drop(session_id)
+        else:
+            memory.add("user", message)
+            memory.add("assistant", result)
+            if crew is not None:
+                memory.note(profile=crew.profile, intent=crew.intent)
+        return result
+
+def stream_customer_support(emit, message, history, session_id=None):
+    return answer_query(message, history, on_event=emit, session_id=session_id)
+
 def run_customer_support(message, history):
     if not message:
         return "", history
@@ -33,44 +86,25 @@ def run_customer_support(message, history):
     history.append({"role": "user", "content": message})
     
     try:
-        # Construct context from history
-        context_str = ""
-        # Get last 5 exchanges to avoid token limits, excluding the current user message which is already in 'message'
-        recent_history = history[-10:] if history else []
-        for msg in recent_history:
-            role = msg.get("role")
-            content = msg.get("content")
-            
-            # Handle Gradio 5+ content format (can be a list of dicts)
-            if isinstance(content, list):
-                text_content = ""
-                for item in content:
-                    if isinstance(item, dict) and item.get("type") == "text":
-                        text_content += item.get("text", "")
-                content = text_content
-            
-            if role == "user":
-                context_str += f"User: {content}\n"
-            elif role == "assistant":
-                context_str += f"Assistant: {content}\n"
-        
-        full_query = f"""
-Previous Conversation History:
-{context_str}
-
-Current User Query:
-{message}
-"""
-        logger.info(f"Received query: {message}")
-        crew = CustomerSupportCrew(full_query)
-        result = crew.run()
-        history.append({"role": "assistant", "content": str(result)})
+        result = answer_query(message, history)
+        history.append({"role": "assistant", "content": result})
     except Exception as e:
         logger.error(f"UI Error: {str(e)}")
         history.append({"role": "assistant", "content": f"An error occurred: {str(e)}"})
         
     return "", history
 
+def knowledge_base_notice():
+    """Status line shown in the chat window until the app and policy knowledge base are ready; stops its timer then."""
+    ready, components = readiness()
+    if ready and "knowledge_base" in components:
+        return gr.update(value="", visible=False), gr.Timer(active=False)
+    if any(c.get("status") == "failed" for c in components.values()):
+        text = "⚠️ *Policy search is unavailable right now; answers may lack policy details.*"
+    else:
+        text = "⏳ *Loading policy documents… policy answers will be available in a moment.*"
+    return gr.update(value=text, visible=True), gr.Timer(active=True)
+
 def toggle_chat(visible):
     return not visible
 
@@ -211,12 +245,16 @@ with gr.Blocks(title="Pulse Telecom") as demo:
                 confirm_yes = gr.Button("Yes, end session", variant="primary")
                 confirm_no = gr.Button("No, keep chatting", variant="secondary")
 
+        kb_status = gr.Markdown(visible=False, elem_id="kb-status")
+        kb_timer = gr.Timer(2)
+        kb_timer.tick(knowledge_base_notice, None, [kb_status, kb_timer])
+
         with gr.Group(visible=True) as chat_main_area:
             chatbot = gr.Chatbot(
                 value=[{"role": "assistant", "content": INITIAL_GREETING}],
                 show_label=False,
                 height=450,
-                avatar_images=(None, "logo.png")
+                avatar_images=(None, LOGO_PATH)
             )
             with gr.Row(elem_id="chat-input-area"):
                 msg_input = gr.Textbox(
@@ -229,23 +267,51 @@ with gr.Blocks(title="Pulse Telecom") as demo:
                 send_btn = gr.Button("➤", size="sm", scale=1, elem_id="send-btn")
 
         # Chat interaction logic
-        def on_user_msg(user_input, history):
+        async def on_user_msg(user_input, history, request: gr.Request):
             if not user_input:
-                return "", history, gr.update(visible=True)
-            
-            resp_input, resp_history = run_customer_support(user_input, history)
-            
+                yield "", history, gr.update(), True
+                return
+
+            if not os.environ.get("OPENAI_API_KEY"):
+                history.append({"role": "assistant", "content": "Error: OPENAI_API_KEY not found."})
+                yield "", history, gr.update(), True
+                return
+
+            history.append({"role": "user", "content": user_input})
+            history.append({"role": "assistant", "content": "…"})
+            yield "", history, gr.update(), True
+
+            # The crew runs in the scheduler's bounded worker pool, one turn per session at a time;
+            # progress notes and the final stage's tokens are streamed into the pending message
+            session_id = request.session_hash if request else None
+            text = ""
+            try:
+                async for kind, chunk in scheduler.stream(session_id, stream_customer_support, user_input, history[:-1], session_id):
+                    if kind == "progress":
+                        if not text:
+                            history[-1]["content"] = f"*{chunk}*"
+                    else:
+                        text += chunk
+                        # Never flash the [CLOSE_CHAT] token (or a piece of it) while streaming
+                        history[-1]["content"] = visible_text(text) or "…"
+                    yield "", history, gr.update(), True
+            except SchedulerBusy:
+                history[-1]["content"] = BUSY_MESSAGE
+                yield user_input, history, gr.update(), True
+                return
+            except Exception as e:
+                logger.error(f"UI Error: {str(e)}")
+                history[-1]["content"] = f"An error occurred: {str(e)}"
+                yield "", history, gr.update(), True
+                return
+
             # Check for [CLOSE_CHAT] token
-            should_close = False
-            if resp_history and resp_history[-1]['role'] == 'assistant':
-                last_msg = resp_history[-1]['content']
-                if "[CLOSE_CHAT]" in last_msg:
-                    should_close = True
-                    resp_history[-1]['content'] = last_msg.replace("[CLOSE_CHAT]", "").strip()
-            
-            if should_close:
-                return "", resp_history, gr.update(elem_classes="floating-chat-container chat-hidden"), False
-            return "", resp_history, gr.update(), True
+            if "[CLOSE_CHAT]" in text:
+                history[-1]["content"] = text.replace("[CLOSE_CHAT]", "").strip()
+                yield "", history, gr.update(elem_classes="floating-chat-container chat-hidden"), False
+                return
+            history[-1]["content"] = text.strip()
+            yield "", history, gr.update(), True
 
         msg_input.submit(on_user_msg, [msg_input, chatbot], [msg_input, chatbot, chat_window, chat_visible])
         send_btn.click(on_user_msg, [msg_input, chatbot], [msg_input, chatbot, chat_window, chat_visible])
@@ -269,9 +335,15 @@ with gr.Blocks(title="Pulse Telecom") as demo:
             outputs=[chat_visible, chat_window]
         )
 
-        def handle_confirm_yes():
+        def handle_confirm_yes(request: gr.Request):
             logger.info("Session end confirmed. Resetting history and closing.")
             print("[SupportBot] Session Ended by User - Resetting State", flush=True)
+            # The next conversation in this tab starts as a stranger: forget the profile and the memory
+            session_id = request.session_hash if request else None
+            if session_id is not None:
+                from src.profile_cache import profile_cache
+                profile_cache.invalidate_session(session_id)
+                memory_store.drop(session_id)
             new_history = [{"role": "assistant", "content": INITIAL_GREETING}]
             # returns: chatbots content, chat_visible state, window classes, confirmation visibility, main_area visibility
             return new_history, False, gr.update(elem_classes="floating-chat-container chat-hidden"), gr.update(visible=False), gr.update(visible=True)
@@ -306,4 +378,12 @@ with gr.Blocks(title="Pulse Telecom") as demo:
     nav_broadband.click(lambda: navigate("broadband"), None, [home_page, mobile_page, broadband_page])
 
 if __name__ == "__main__":
-    demo.launch(server_name="0.0.0.0", server_port=7860, css=APP_CSS, theme=gr.themes.Soft())
+    start_metrics_server()
+    # Import the crews and build or load the index in the background so the first customer never waits for it
+    warmup.start()
+    # Concurrency is governed by the request scheduler, not by Gradio's per-event worker limit
+    demo.queue(default_concurrency_limit=None)
+    demo.launch(
+        server_name="0.0.0.0", server_port=int(os.environ.get("GRADIO_SERVER_PORT", "7860")),
+        css=APP_CSS, theme=gr.themes.Soft(),
+    )
@@ -0,0 +1,264 @@
+"""
+Deterministic local stand-in for the parts of the OpenAI API the app uses:
+POST /v1/chat/completions (plain and streamed) and POST /v1/embeddings.
+
+Chat answers are canned per agent role (read from the "You are <role>." system prompt) and
+drive crewai's tool loop like a real model would: retrieval agents call the User Details and
+Policy Search tools, the other agents give a final answer. Embeddings are deterministic hashing
+vectors, so retrieval over the real FAISS index still returns relevant chunks. Latency is
+configurable as a fixed time per call plus a time per completion token.
+
+    python benchmarks/mock_openai.py --port 8765 --latency 0.2 --token-latency 0.005
+"""
+import argparse
+import base64
+import json
+import os
+import re
+import sys
+import threading
+import time
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from src.embeddings import HashingEmbeddings  # noqa: E402
+
+EMBEDDING_DIM = 1536
+
+ROLE_RE = re.compile(r"You are ([^.\n]+)\.")
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+NAME_RE = re.compile(r"\b(?i:i am|i'm|my name is|this is)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)+)")
+CURRENT_QUERY_RE = re.compile(r"Current User Query:\s*(.+?)\s*(?:\n\n|\"|$)", re.DOTALL)
+ACTION_RE = re.compile(r"^Action: (.+)$", re.MULTILINE)
+OBSERVATION_RE = re.compile(r"Observation: (.*?)(?=\n(?:Thought|Action)\b|\Z)", re.DOTALL)
+DRAFT_RE = re.compile(r'Draft:\s*"""(.*?)"""', re.DOTALL)
+# crewai ends the task prompt with "Begin!"; the streamed stages (src/streaming.py) with "Respond with the final answer only"
+CONTEXT_RE = re.compile(r"This is the context you're working with:\n(.*?)\n\n(?:Begin!|Respond with the final answer only)", re.DOTALL)
+# The streamed tone stage gets the draft and the QA verdict; QA passes the approved answer through
+REVIEW_RE = re.compile(r"Compliance review:\n(.*)", re.DOTALL)
+
+CATEGORIES = [
+    ("Refund & Cancellation", re.compile(r"refund|cancel|money back", re.IGNORECASE)),
+    ("Billing", re.compile(r"bill|invoice|charge|pay|dues|owe|balance|price|cost", re.IGNORECASE)),
+    ("Technical Support", re.compile(r"internet|wifi|router|slow|outage|signal|speed|connect", re.IGNORECASE)),
+    ("Account Management", re.compile(r"plan|upgrade|account|address", re.IGNORECASE)),
+]
+ANSWERS = {
+    "Refund & Cancellation": "Subscriptions can be refunded within 14 days of purchase, and you can cancel anytime under Account Settings > Subscription > Cancel.",
+    "Billing": "Your bill is issued monthly on your billing date, and you can pay online or set up automatic payments in your account.",
+    "Technical Support": "Please restart your router and check that all cables are secure. If the issue continues, I have raised Ticket #TCK-{n} for our technicians.",
+    "Account Management": "You can review or upgrade your plan at any time from your account page, and changes take effect from the next billing cycle.",
+    "General Inquiry": "Happy to help with anything about your Pulse Telecom services. Could you tell me a bit more about what you need?",
+}
+
+
+def _tokens(text):
+    return max(1, len(text) // 4)
+
+
+def _current_query(prompt):
+    match = CURRENT_QUERY_RE.search(prompt)
+    return match.group(1).strip() if match else prompt[-300:]
+
+
+def _category(text):
+    for name, pattern in CATEGORIES:
+        if pattern.search(text):
+            return name
+    return "General Inquiry"
+
+
+def _identifier(prompt):
+    if "Verified customer profile" in prompt:
+        return None
+    email = EMAIL_RE.search(prompt)
+    name = NAME_RE.search(prompt)
+    parts = [m.group(1) if m is name else m.group(0) for m in (name, email) if m]
+    return ", ".join(parts) or None
+
+
+def _final(text):
+    return f"Thought: I now can give a great answer\nFinal Answer: {text}"
+
+
+def _action(tool, **args):
+    return f"Thought: I should use a tool.\nAction: {tool}\nAction Input: {json.dumps(args)}"
+
+
+def canned_reply(messages, stream):
+    """The reply for a chat request: (text, role of the agent that asked)."""
+    system = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+    role = (ROLE_RE.search(system or "") or [None, "assistant"])[1]
+    prompt = "\n".join(str(m.get("content", "")) for m in messages if m.get("role") == "user")
+    history = [str(m.get("content", "")) for m in messages if m.get("role") == "assistant"]
+    used = [a for h in history for a in ACTION_RE.findall(h)]
+    observations = [o.strip() for h in history for o in OBSERVATION_RE.findall(h)]
+    query = _current_query(prompt)
+    identifier = _identifier(prompt)
+
+    if role in ("Information Retrieval Specialist", "Account Lookup Specialist", "Policy Research Specialist"):
+        plan = []
+        if identifier and role != "Policy Research Specialist":
+            plan.append(("User Details Tool", {"identifier": identifier}))
+        if role != "Account Lookup Specialist":
+            plan.append(("Policy Search Tool", {"query": query[:200]}))
+        for tool, args in plan:
+            if tool not in used:
+                return _action(tool, **args), role
+        found = "\n\n".join(o[:1500] for o in observations) or "No user identified"
+        return _final(found), role
+
+    if role == "Intent Classification Specialist":
+        text = f"Category: {_category(query)}, User: {identifier or 'None'}"
+    elif role == "Compliance & Tone Editor":
+        draft = DRAFT_RE.search(prompt)
+        text = draft.group(1).strip() if draft else ANSWERS["General Inquiry"]
+    elif role in ("Compliance & Quality Officer", "Tone & Empathy Specialist"):
+        # Pass the reviewed draft through, so the final text stays a real answer
+        context = CONTEXT_RE.search(prompt)
+        text = context.group(1).strip() if context else "Approved"
+        review = REVIEW_RE.search(text)
+        if review:
+            text = review.group(1).strip()
+    else:
+        if re.search(r"\b(bye|that's all|nothing else)\b", query, re.IGNORECASE):
+            text = "Thank you for contacting Pulse Telecom. Have a great day! [CLOSE_CHAT]"
+        elif re.fullmatch(r"(hi|hello|hey|thanks?|thank you|ok(ay)?)[\s!.]*", query, re.IGNORECASE):
+            text = "Hello! Are you an existing customer? If so, please share your Name and Email so I can access your account."
+        else:
+            text = ANSWERS[_category(query)].format(n=sum(map(ord, query)) % 100000)
+    return (text if stream else _final(text)), role
+
+
+def embed(item, embedder):
+    """Embeds a string or a list of token ids (as sent by OpenAIEmbeddings with tiktoken)."""
+    if isinstance(item, list):
+        item = " ".join(f"t{token}" for token in item)
+    return embedder.embed_query(item)
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    token_latency = 0.0
+    embedder = HashingEmbeddings(dim=EMBEDDING_DIM)
+    calls = {}
+    calls_lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        # Calls served so far, by kind; lets a benchmark running in another process read them
+        if self.path.rstrip("/").endswith("/stats"):
+            with self.calls_lock:
+                self._json(200, dict(self.calls))
+        else:
+            self._json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path.rstrip("/").endswith("/chat/completions"):
+            self._chat(body)
+        elif self.path.rstrip("/").endswith("/embeddings"):
+            self._embeddings(body)
+        else:
+            self._json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def _count(self, key):
+        with self.calls_lock:
+            self.calls[key] = self.calls.get(key, 0) + 1
+
+    def _chat(self, body):
+        messages = body.get("messages", [])
+        stream = bool(body.get("stream"))
+        text, role = canned_reply(messages, stream)
+        self._count(f"chat:{role}")
+        prompt_tokens = sum(_tokens(str(m.get("content", ""))) for m in messages)
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": _tokens(text), "total_tokens": prompt_tokens + _tokens(text)}
+        model = body.get("model", "gpt-4o")
+        time.sleep(self.latency)
+        if not stream:
+            time.sleep(self.token_latency * _tokens(text))
+            self._json(200, {
+                "id": "chatcmpl-mock", "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        base = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(time.time()), "model": model}
+        words = re.findall(r"\S+\s*", text)
+        for i, word in enumerate(words):
+            time.sleep(self.token_latency * _tokens(word))
+            delta = {"role": "assistant", "content": word} if i == 0 else {"content": word}
+            self._event({**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+        self._event({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if (body.get("stream_options") or {}).get("include_usage"):
+            self._event({**base, "choices": [], "usage": usage})
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+    def _embeddings(self, body):
+        inputs = body.get("input", [])
+        # A single string, a list of strings, a list of token ids, or a list of token-id lists
+        if isinstance(inputs, str) or (isinstance(inputs, list) and inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        self._count("embeddings")
+        time.sleep(self.latency)
+        data = []
+        for i, item in enumerate(inputs):
+            vector = embed(item, self.embedder)
+            if body.get("encoding_format") == "base64":
+                vector = base64.b64encode(array("f", vector).tobytes()).decode("ascii")
+            data.append({"object": "embedding", "index": i, "embedding": vector})
+        tokens = sum(len(i) if isinstance(i, list) else _tokens(i) for i in inputs)
+        self._json(200, {
+            "object": "list", "data": data, "model": body.get("model", "text-embedding-ada-002"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        })
+
+    def _event(self, payload):
+        self.wfile.write(b"data: " + json.dumps(payload).encode("utf-8") + b"\n\n")
+        self.wfile.flush()
+
+    def _json(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def start_server(port=0, latency=0.0, token_latency=0.0):
+    """Starts the mock in a daemon thread; returns the server (its port is server.server_port)."""
+    handler = type("Handler", (MockOpenAIHandler,), {"latency": latency, "token_latency": token_latency, "calls": {}})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-openai", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765, help="0 picks a free port")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every API call")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Seconds added per completion token")
+    args = parser.parse_args()
+    server = start_server(args.port, args.latency, args.token_latency)
+    print(f"Mock OpenAI API on http://127.0.0.1:{server.server_port}/v1", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
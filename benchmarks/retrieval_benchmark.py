@@ -0,0 +1,388 @@
+"""
+Retrieval quality and latency benchmark for PolicySearchTool.
+
+Splits data/*.txt with each chunking configuration, builds the vector and BM25 indexes, and runs
+the labelled queries in benchmarks/retrieval_queries.jsonl through PolicyKnowledgeBase.search
+(the code path the tool uses) in vector, lexical and hybrid mode. Reports recall@k, MRR, the
+prompt tokens the top-k chunks cost, query latency, index build time and index memory.
+
+A query's relevant chunks are those from one of its source files that contain its answer
+phrase, so the labels hold for any chunking. --synthetic adds deterministic distractor chunks
+built from the corpus vocabulary to measure quality and latency at scale (100k+ chunks).
+Embeddings default to the offline, deterministic hashing backend. Indexes are built by
+src/vector_index.py, so --index takes the KB_INDEX_TYPE values (flat, ivf, hnsw, pq).
+
+--scale skips text entirely and compares the index types on clustered random vectors at
+10^5-10^6 chunks: build time, size on disk, RAM when loaded or memory-mapped, query latency and
+recall@10 against exact search. Each load is measured in a fresh child process, so its RSS is not
+hidden by heap pages freed from an earlier build. Embedding that many chunks with a real backend is what the
+index types are for, but not what they are measured on.
+
+    python benchmarks/retrieval_benchmark.py
+    python benchmarks/retrieval_benchmark.py --chunk-sizes 300,500,1000 --overlaps 0,100 --index flat,hnsw,ivf
+    python benchmarks/retrieval_benchmark.py --synthetic 100000 --chunk-sizes 1000 --modes vector,hybrid
+    python benchmarks/retrieval_benchmark.py --scale 100000,1000000 --index flat,ivf,hnsw,pq --dim 256
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+DEFAULT_QUERIES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "retrieval_queries.jsonl")
+
+# Benchmarks measure the backends themselves: no embedding cache, no persisted index
+os.environ.setdefault("EMBEDDING_CACHE_PATH", "")
+os.environ.setdefault("KB_INDEX_DIR", tempfile.mkdtemp(prefix="pulse-retrieval-"))
+os.environ.setdefault("METRICS_PORT", "0")
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+sys.path.insert(0, os.path.abspath(ROOT))
+
+import faiss  # noqa: E402
+import numpy as np  # noqa: E402
+from langchain.text_splitter import RecursiveCharacterTextSplitter  # noqa: E402
+from langchain_core.documents import Document  # noqa: E402
+from src.embeddings import HashingEmbeddings, create_embeddings, tokenize  # noqa: E402
+from src.index_store import list_source_files  # noqa: E402
+from src.lexical import BM25Index  # noqa: E402
+from src.memory import count_tokens  # noqa: E402
+from src import vector_index  # noqa: E402
+from src.tools import PolicyKnowledgeBase  # noqa: E402
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=os.path.join(ROOT, "data"))
+    parser.add_argument("--queries", default=DEFAULT_QUERIES, help="JSONL of {query, sources, answer}")
+    parser.add_argument("--chunk-sizes", default="300,500,1000")
+    parser.add_argument("--overlaps", default="0,100")
+    parser.add_argument("--index", default="flat", help=f"Comma-separated, from {', '.join(vector_index.INDEX_TYPES)}")
+    parser.add_argument("--backends", default="hashing", help="Embedding backends: hashing, openai, huggingface")
+    parser.add_argument("--dim", type=int, default=512, help="Hashing (or --scale) embedding dimension")
+    parser.add_argument("--modes", default="vector,lexical,hybrid")
+    parser.add_argument("--k", default="1,3,5", help="Cut-offs for recall@k")
+    parser.add_argument("--synthetic", type=int, default=0, help="Distractor chunks added to the corpus")
+    parser.add_argument("--synthetic-overlap", type=float, default=0.3, help="Share of distractor words taken from the corpus")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--nprobe", type=int, default=vector_index.IVF_NPROBE, help="IVF/PQ lists probed per query")
+    parser.add_argument("--ef-search", type=int, default=vector_index.HNSW_EF_SEARCH, help="HNSW candidate list size per query")
+    parser.add_argument("--scale", help="Comma-separated vector counts for the index-only benchmark, e.g. 100000,1000000")
+    parser.add_argument("--scale-queries", type=int, default=200, help="Queries per --scale run")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs of every query")
+    parser.add_argument("--output", help="Also write the results as JSON to this path")
+    # Internal: the child process of a --scale load measurement (index path, queries .npy, ram|mmap)
+    parser.add_argument("--measure-load", nargs=3, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def split_list(value, cast=str):
+    return [cast(v.strip()) for v in value.split(",") if v.strip()]
+
+
+def load_queries(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def load_corpus(data_dir):
+    """(relative path, text) of every .txt source, as the knowledge base would index them."""
+    corpus = []
+    for rel_path in list_source_files(data_dir):
+        if rel_path.lower().endswith(".txt"):
+            with open(os.path.join(data_dir, rel_path), encoding="utf-8") as f:
+                corpus.append((rel_path, f.read()))
+    return corpus
+
+
+def split_corpus(corpus, chunk_size, chunk_overlap):
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    chunks = []
+    for rel_path, text in corpus:
+        for i, piece in enumerate(splitter.split_text(text)):
+            chunks.append(Document(page_content=piece, metadata={"source": rel_path}, id=f"{rel_path}::{i}"))
+    return chunks
+
+
+def synthetic_chunks(corpus, count, chunk_size, seed, overlap=0.3):
+    """
+    Deterministic distractor chunks: sentences of pseudo-words, with a share `overlap` of words
+    taken from the corpus vocabulary so distractors compete with real chunks on the same terms.
+    """
+    rng = random.Random(seed)
+    vocabulary = sorted({t for _, text in corpus for t in tokenize(text)})
+    syllables = ["ka", "lo", "mi", "ner", "tas", "vu", "quen", "dor", "pha", "rix", "sel", "bo", "tri", "gan"]
+    filler = sorted({"".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))) for _ in range(20000)})
+    chunks = []
+    for i in range(count):
+        words = []
+        while sum(len(w) + 1 for w in words) < chunk_size * 0.8:
+            words.extend(
+                rng.choice(vocabulary) if rng.random() < overlap else rng.choice(filler)
+                for _ in range(rng.randint(6, 14))
+            )
+            words[-1] += "."
+        chunks.append(Document(page_content=" ".join(words), metadata={"source": f"synthetic/{i}.txt"}, id=f"synthetic::{i}"))
+    return chunks
+
+
+def _normalize(text):
+    return " ".join(text.split()).lower()
+
+
+def is_relevant(doc, query):
+    return doc.metadata.get("source") in query["sources"] and _normalize(query["answer"]) in _normalize(doc.page_content)
+
+
+def create_backend(name, dim):
+    if name == "hashing":
+        return HashingEmbeddings(dim=dim)
+    return create_embeddings(name)
+
+
+def rss_mb():
+    """Resident set size of this process in MB (Linux), or None."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return None
+
+
+def build_indexes(chunks, embeddings, index_type, args):
+    """Embeds the chunks and builds the FAISS and BM25 indexes. Returns (vector_db, bm25, stats)."""
+    rss_before = rss_mb()
+    texts = [c.page_content for c in chunks]
+    started = time.perf_counter()
+    vectors = embeddings.embed_documents(texts)
+    embed_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    vector_db = vector_index.build_vector_store(chunks, vectors, [c.id for c in chunks], embeddings, index_type)
+    index_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    bm25 = BM25Index()
+    bm25.add_many((c.id, c.page_content) for c in chunks)
+    bm25_seconds = time.perf_counter() - started
+    del vectors
+    rss_after = rss_mb()
+    return vector_db, bm25, {
+        "embed_seconds": round(embed_seconds, 4),
+        "index_seconds": round(index_seconds, 4),
+        "bm25_seconds": round(bm25_seconds, 4),
+        "build_seconds": round(embed_seconds + index_seconds + bm25_seconds, 4),
+        "index_mb": round(faiss.serialize_index(vector_db.index).nbytes / 2**20, 3),
+        "rss_delta_mb": _rss_delta(rss_before, rss_after),
+    }
+
+
+def use_index(vector_db, bm25, embeddings):
+    """Points PolicyKnowledgeBase.search at the benchmark's indexes."""
+    with PolicyKnowledgeBase._lock:
+        PolicyKnowledgeBase.vector_db = vector_db
+        PolicyKnowledgeBase.lexical_index = bm25
+        PolicyKnowledgeBase.embeddings = embeddings
+
+
+def evaluate(queries, mode, ks, repeat):
+    """recall@k, MRR@depth, top-k context tokens and latency of one retrieval mode."""
+    depth = max(max(ks), 10)
+    hits = {k: 0 for k in ks}
+    context_tokens = {k: [] for k in ks}
+    reciprocal_ranks = []
+    latencies = []
+    answerable = 0
+    for query in queries:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            docs = PolicyKnowledgeBase.search(query["query"], k=depth, mode=mode)
+            latencies.append((time.perf_counter() - started) * 1000)
+        relevant = [i for i, doc in enumerate(docs) if is_relevant(doc, query)]
+        answerable += query["answerable"]
+        reciprocal_ranks.append(1 / (relevant[0] + 1) if relevant else 0.0)
+        for k in ks:
+            hits[k] += bool(relevant and relevant[0] < k)
+            context_tokens[k].append(count_tokens("\n\n".join(d.page_content for d in docs[:k])))
+    latencies.sort()
+    result = {f"recall@{k}": round(hits[k] / len(queries), 4) for k in ks}
+    result.update({
+        f"mrr@{depth}": round(statistics.fmean(reciprocal_ranks), 4),
+        "answerable": round(answerable / len(queries), 4),
+        "latency_p50_ms": round(latencies[len(latencies) // 2], 3),
+        "latency_p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+    })
+    result.update({f"context_tokens@{k}": round(statistics.fmean(context_tokens[k]), 1) for k in ks})
+    return result
+
+
+def set_search_params(args):
+    # apply_search_params reads these when an index is built or loaded
+    vector_index.IVF_NPROBE = args.nprobe
+    vector_index.HNSW_EF_SEARCH = args.ef_search
+
+
+def clustered_vectors(count, dim, seed, clusters=1000):
+    """Random vectors around `clusters` centres, closer to real embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim), dtype=np.float32)
+    matrix = np.empty((count, dim), dtype=np.float32)
+    step = 100000
+    for start in range(0, count, step):
+        end = min(count, start + step)
+        matrix[start:end] = centres[rng.integers(0, clusters, end - start)]
+        matrix[start:end] += 0.5 * rng.standard_normal((end - start, dim), dtype=np.float32)
+    return matrix
+
+
+def _rss_delta(before, after):
+    return round(after - before, 1) if before is not None and after is not None else None
+
+
+def measure_load(path, queries_path, label):
+    """Loads one index (in RAM or memory-mapped) and queries it; runs in a fresh process, see scale_run."""
+    queries = np.load(queries_path)
+    flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if label == "mmap" else 0
+    rss_before = rss_mb()
+    index = vector_index.apply_search_params(faiss.read_index(path, flags))
+    loaded = rss_mb()
+    latencies = []
+    found = []
+    for query in queries:
+        started = time.perf_counter()
+        _, ids = index.search(query[None, :], 10)
+        latencies.append((time.perf_counter() - started) * 1000)
+        found.append(ids[0].tolist())
+    latencies.sort()
+    return {
+        f"{label}_load_mb": _rss_delta(rss_before, loaded),
+        f"{label}_after_queries_mb": _rss_delta(rss_before, rss_mb()),
+        f"{label}_p50_ms": round(latencies[len(latencies) // 2], 3),
+        f"{label}_p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+    }, found
+
+
+def scale_run(count, index_type, matrix, queries, truth, workdir, args):
+    """Build, size, RAM and latency/recall of one index type over `matrix`."""
+    started = time.perf_counter()
+    index = vector_index.build_index(matrix, index_type)
+    index.add(matrix)
+    build_seconds = time.perf_counter() - started
+    path = os.path.join(workdir, f"{index_type}-{count}.faiss")
+    faiss.write_index(index, path)
+    del index
+    queries_path = os.path.join(workdir, "queries.npy")
+    np.save(queries_path, queries)
+
+    row = {"index": index_type, "chunks": count, "build_seconds": round(build_seconds, 3),
+           "index_mb": round(os.path.getsize(path) / 2**20, 1)}
+    for label in ("ram", "mmap"):
+        # This process has just freed the built index; a reload here would reuse those heap pages
+        # and show almost no growth, so every load is measured in a process of its own
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--measure-load", path, queries_path, label,
+             "--nprobe", str(args.nprobe), "--ef-search", str(args.ef_search)],
+            capture_output=True, text=True, check=True,
+        )
+        measured, found = json.loads(result.stdout.strip().splitlines()[-1])
+        row.update(measured)
+    row["recall@10"] = round(statistics.fmean(len(set(f) & set(t)) / 10 for f, t in zip(found, truth)), 4)
+    os.remove(path)
+    return row
+
+
+def _mb(value):
+    return f"{value:.1f}MB" if value is not None else "n/a"
+
+
+def run_scale(args):
+    """Index-only benchmark of every --index type at every --scale size."""
+    results = []
+    workdir = tempfile.mkdtemp(prefix="pulse-ann-")
+    for count in split_list(args.scale, int):
+        matrix = clustered_vectors(count, args.dim, args.seed)
+        rng = np.random.default_rng(args.seed + 1)
+        # Queries are perturbed corpus vectors, so each has true near neighbours
+        queries = matrix[rng.integers(0, count, args.scale_queries)] + 0.1 * rng.standard_normal(
+            (args.scale_queries, args.dim), dtype=np.float32)
+        exact = faiss.IndexFlatL2(args.dim)
+        exact.add(matrix)
+        truth = exact.search(queries, 10)[1]
+        del exact
+        for index_type in split_list(args.index):
+            row = scale_run(count, index_type, matrix, queries, truth, workdir, args)
+            results.append(row)
+            print(
+                f"{row['index']:<5} chunks {count:>8}  build {row['build_seconds']:>8.2f}s  disk {row['index_mb']:>7.1f}MB  "
+                f"RAM load {_mb(row['ram_load_mb']):>9} mmap load {_mb(row['mmap_load_mb']):>8} "
+                f"(after queries {_mb(row['mmap_after_queries_mb'])})  p50 {row['ram_p50_ms']:.3f}ms "
+                f"p95 {row['ram_p95_ms']:.3f}ms  mmap p95 {row['mmap_p95_ms']:.3f}ms  R@10 {row['recall@10']:.3f}",
+                flush=True,
+            )
+        del matrix
+    return results
+
+
+def run(args):
+    corpus = load_corpus(args.data)
+    queries = load_queries(args.queries)
+    ks = split_list(args.k, int)
+    results = []
+    for backend in split_list(args.backends):
+        embeddings = create_backend(backend, args.dim)
+        for chunk_size in split_list(args.chunk_sizes, int):
+            for overlap in split_list(args.overlaps, int):
+                if overlap >= chunk_size:
+                    continue
+                chunks = split_corpus(corpus, chunk_size, overlap)
+                # A query the chunking cannot answer (its answer split across chunks) counts as a miss
+                for query in queries:
+                    query["answerable"] = any(is_relevant(c, query) for c in chunks)
+                real_chunks = len(chunks)
+                chunks += synthetic_chunks(corpus, args.synthetic, chunk_size, args.seed, args.synthetic_overlap)
+                for index_type in split_list(args.index):
+                    vector_db, bm25, build = build_indexes(chunks, embeddings, index_type, args)
+                    use_index(vector_db, bm25, embeddings)
+                    for mode in split_list(args.modes):
+                        row = {
+                            "backend": backend, "chunk_size": chunk_size, "chunk_overlap": overlap,
+                            "index": index_type, "mode": mode, "chunks": len(chunks), "corpus_chunks": real_chunks,
+                            **build, **evaluate(queries, mode, ks, args.repeat),
+                        }
+                        results.append(row)
+                        print_row(row, ks)
+                    use_index(None, None, None)
+    return results
+
+
+def print_row(row, ks):
+    recalls = " ".join(f"R@{k} {row[f'recall@{k}']:.2f}" for k in ks)
+    mrr = next(v for key, v in row.items() if key.startswith("mrr@"))
+    print(
+        f"{row['backend']:<8} size {row['chunk_size']:>5} overlap {row['chunk_overlap']:>4} {row['index']:<5} "
+        f"{row['mode']:<7} chunks {row['chunks']:>7}  {recalls}  MRR {mrr:.3f}  "
+        f"ctx@{ks[-1]} {row[f'context_tokens@{ks[-1]}']:>6.0f} tok  p50 {row['latency_p50_ms']:.2f}ms "
+        f"p95 {row['latency_p95_ms']:.2f}ms  build {row['build_seconds']:.2f}s  index {row['index_mb']:.1f}MB",
+        flush=True,
+    )
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    set_search_params(args)
+    if args.measure_load:
+        print(json.dumps(measure_load(*args.measure_load)))
+        return 0
+    results = run_scale(args) if args.scale else run(args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
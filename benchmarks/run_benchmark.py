@@ -0,0 +1,254 @@
+"""
+Offline end-to-end benchmark: replays a corpus of chat transcripts through the real app
+(router, crew pipelines, tools, FAISS knowledge base, user store, caches) against the local
+mock OpenAI server in benchmarks/mock_openai.py, and reports throughput, latency percentiles
+and where the time goes per pipeline stage and per tool. Needs no network or API key, so it
+can run in CI to catch latency regressions.
+
+    python benchmarks/run_benchmark.py --concurrency 8 --repeat 3 --latency 0.2
+    python benchmarks/run_benchmark.py --process dag --output results.json --max-p95 5
+    python benchmarks/run_benchmark.py --stream --token-latency 0.01
+
+Every conversation runs as its own chat session; --concurrency sessions are replayed at once.
+With --stream, turns go through the streaming path the chat widget uses and the report adds the
+time to the first response token.
+Exits with status 1 when --max-p95 is given and the p95 turn latency exceeds it.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+DEFAULT_TRANSCRIPTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "transcripts.jsonl")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transcripts", default=DEFAULT_TRANSCRIPTS, help="JSONL of {id, turns: [user messages]}")
+    parser.add_argument("--concurrency", type=int, default=4, help="Conversations replayed at once")
+    parser.add_argument("--repeat", type=int, default=1, help="Times the corpus is replayed")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mock seconds per API call")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Mock seconds per completion token")
+    parser.add_argument("--pipeline-mode", choices=["five_stage", "validated"], default="five_stage")
+    parser.add_argument("--process", choices=["sequential", "dag"], default="sequential")
+    parser.add_argument("--no-response-cache", action="store_true", help="Disable the semantic response cache")
+    parser.add_argument("--stream", action="store_true", help="Stream replies like the chat widget and report time to first token")
+    parser.add_argument("--output", help="Also write the report as JSON to this path")
+    parser.add_argument("--max-p95", type=float, help="Fail when the p95 turn latency (s) exceeds this")
+    return parser.parse_args(argv)
+
+
+def configure_environment(args, workdir):
+    """Points the app at throwaway index, cache and user database files; see also use_mock_server."""
+    os.environ.update({
+        "OPENAI_API_KEY": "sk-benchmark",
+        "EMBEDDING_PROVIDER": "openai",
+        # tiktoken downloads its encodings on first use; send raw text to the mock instead
+        "OPENAI_EMBEDDING_CHECK_CTX_LENGTH": "false",
+        "KB_INDEX_DIR": os.path.join(workdir, "kb_index"),
+        "EMBEDDING_CACHE_PATH": os.path.join(workdir, "embeddings.sqlite"),
+        "USER_DB_PATH": os.path.join(workdir, "users.db"),
+        "CREW_PIPELINE_MODE": args.pipeline_mode,
+        "CREW_PROCESS": args.process,
+        "RESPONSE_CACHE_ENABLED": "false" if args.no_response_cache else "true",
+        "METRICS_PORT": "0",
+        "METRICS_TRACE_HISTORY": "1000000",
+        "LITELLM_LOCAL_MODEL_COST_MAP": "True",
+        "OTEL_SDK_DISABLED": "true",
+        "CREWAI_TELEMETRY_OPT_OUT": "true",
+    })
+
+
+def start_mock_server(args):
+    """
+    Runs the mock API in its own process, so its work neither competes with the app under test
+    for the GIL nor shows up in the measured latencies. Returns (process, base_url).
+    """
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "benchmarks", "mock_openai.py"), "--port", "0",
+         "--latency", str(args.latency), "--token-latency", str(args.token_latency)],
+        stdout=subprocess.PIPE, text=True,
+    )
+    line = process.stdout.readline()
+    match = re.search(r"http://\S+/v1", line)
+    if not match:
+        process.kill()
+        raise RuntimeError(f"Mock OpenAI server did not start: {line!r}")
+    base_url = match.group(0)
+    os.environ.update({"OPENAI_BASE_URL": base_url, "OPENAI_API_BASE": base_url})
+    return process, base_url
+
+
+def mock_stats(base_url):
+    with urllib.request.urlopen(f"{base_url}/stats", timeout=10) as response:
+        return json.load(response)
+
+
+def load_transcripts(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize(values):
+    return {
+        "count": len(values),
+        "mean": round(statistics.fmean(values), 4) if values else None,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else None,
+    }
+
+
+def replay(answer_query, conversation, session_id, stream=False):
+    """Plays one conversation turn by turn; returns (seconds, seconds to first token or None, error) per turn."""
+    history = []
+    results = []
+    for message in conversation["turns"]:
+        history.append({"role": "user", "content": message})
+        started = time.perf_counter()
+        first_token = []
+
+        def on_event(kind, text):
+            if kind == "token" and text and not first_token:
+                first_token.append(time.perf_counter() - started)
+
+        try:
+            reply = answer_query(message, history, on_event=on_event if stream else None, session_id=session_id)
+            error = None
+        except Exception as e:
+            reply, error = f"Error: {e}", str(e)
+        results.append((time.perf_counter() - started, first_token[0] if first_token else None, error))
+        history.append({"role": "assistant", "content": reply})
+        if "[CLOSE_CHAT]" in reply:
+            break
+    return results
+
+
+def breakdown(traces):
+    """Per-route, per-stage and per-tool timing from the request traces."""
+    routes, stages, tools = {}, {}, {}
+    for trace in traces:
+        routes.setdefault(trace["route"], []).append(trace["seconds"])
+        for span in trace["spans"]:
+            if span["kind"] == "stage":
+                entry = stages.setdefault(span["name"], {"seconds": [], "llm_calls": 0, "tokens": 0, "cost_usd": 0.0})
+                if span["seconds"] is not None:
+                    entry["seconds"].append(span["seconds"])
+                entry["llm_calls"] += span["llm_calls"]
+                entry["tokens"] += span["prompt_tokens"] + span["completion_tokens"]
+                entry["cost_usd"] += span["cost_usd"]
+            elif span["kind"] == "tool":
+                entry = tools.setdefault(span["name"], {"seconds": [], "status": {}})
+                entry["seconds"].append(span["seconds"])
+                entry["status"][span["status"]] = entry["status"].get(span["status"], 0) + 1
+    return (
+        {name: summarize(values) for name, values in routes.items()},
+        {name: {**summarize(e["seconds"]), "llm_calls": e["llm_calls"], "tokens": e["tokens"], "cost_usd": round(e["cost_usd"], 6)} for name, e in stages.items()},
+        {name: {**summarize(e["seconds"]), "status": e["status"]} for name, e in tools.items()},
+    )
+
+
+def print_report(report):
+    turns = report["turns"]
+    print(f"\n{report['conversations']} conversations, {turns['count']} turns, {report['errors']} errors "
+          f"in {report['wall_seconds']:.2f}s at concurrency {report['config']['concurrency']}")
+    print(f"Throughput: {report['turns_per_second']:.2f} turns/s, {report['llm_calls']} LLM calls, "
+          f"{report['mock_calls']} mock API calls")
+    print(f"Turn latency (s): p50 {turns['p50']:.3f}  p95 {turns['p95']:.3f}  p99 {turns['p99']:.3f}  max {turns['max']:.3f}")
+    ttft = report.get("time_to_first_token")
+    if ttft and ttft["count"]:
+        print(f"Time to first token (s): p50 {ttft['p50']:.3f}  p95 {ttft['p95']:.3f}  p99 {ttft['p99']:.3f}  max {ttft['max']:.3f}")
+    for title, rows in (("Route", report["routes"]), ("Stage", report["stages"]), ("Tool", report["tools"])):
+        if not rows:
+            continue
+        print(f"\n{title:<34}{'count':>7}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+        for name, row in sorted(rows.items(), key=lambda item: -(item[1]["mean"] or 0)):
+            if not row["count"]:
+                continue
+            print(f"{name:<34}{row['count']:>7}{row['mean']:>9.3f}{row['p50']:>9.3f}{row['p95']:>9.3f}{row['p99']:>9.3f}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sys.path.insert(0, os.path.abspath(ROOT))
+    os.chdir(ROOT)
+    configure_environment(args, tempfile.mkdtemp(prefix="pulse-bench-"))
+    mock, base_url = start_mock_server(args)
+    try:
+        report = run(args, base_url)
+    finally:
+        mock.kill()
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.max_p95 is not None and report["turns"]["p95"] > args.max_p95:
+        print(f"\nFAIL: p95 {report['turns']['p95']:.3f}s exceeds --max-p95 {args.max_p95}s")
+        return 1
+    return 0
+
+
+def run(args, base_url):
+    """Builds the knowledge base, replays the corpus and returns the report."""
+    from app import answer_query
+    from src.metrics import recent_traces
+    from src.tools import PolicyKnowledgeBase
+
+    started = time.perf_counter()
+    PolicyKnowledgeBase.initialize()
+    index_seconds = time.perf_counter() - started
+
+    conversations = load_transcripts(args.transcripts) * args.repeat
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        futures = [
+            pool.submit(replay, answer_query, conversation, f"bench-{i}-{conversation['id']}", args.stream)
+            for i, conversation in enumerate(conversations)
+        ]
+        results = [turn for future in futures for turn in future.result()]
+    wall_seconds = time.perf_counter() - started
+
+    traces = recent_traces(limit=len(results) + 1)
+    routes, stages, tools = breakdown(traces)
+    calls = mock_stats(base_url)
+    seconds = [s for s, _, _ in results]
+    report = {
+        "config": vars(args),
+        "index_build_seconds": round(index_seconds, 4),
+        "conversations": len(conversations),
+        "errors": sum(1 for _, _, error in results if error),
+        "wall_seconds": round(wall_seconds, 4),
+        "turns_per_second": len(results) / wall_seconds if wall_seconds else 0.0,
+        "turns": summarize(seconds),
+        "time_to_first_token": summarize([t for _, t, _ in results if t is not None]) if args.stream else None,
+        "llm_calls": sum(t["llm_calls"] for t in traces),
+        "mock_calls": sum(calls.values()),
+        "mock_calls_by_kind": calls,
+        "routes": routes,
+        "stages": stages,
+        "tools": tools,
+    }
+    return report
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""
+Start-up benchmark: launches `python app.py` as a fresh process and measures the time until the
+UI answers HTTP requests and until /readyz reports ready (crew modules imported, knowledge base
+loaded), and profiles the import time of app.py with `python -X importtime`.
+
+    python benchmarks/startup_benchmark.py
+    python benchmarks/startup_benchmark.py --runs 3 --budget-ui 15 --budget-ready 40 --output startup.json
+    python benchmarks/startup_benchmark.py --profile-only --top 40
+
+The first run starts with an empty index directory (a cold build); later runs reuse the index
+it persisted, like a restart. Embeddings use the offline hashing backend, so no network or API
+key is needed. Exits with status 1 when a run exceeds --budget-ui or --budget-ready.
+"""
+import argparse
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)$")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=2, help="App launches; the first builds the index")
+    parser.add_argument("--timeout", type=float, default=300, help="Seconds to wait for a launch to get ready")
+    parser.add_argument("--budget-ui", type=float, default=12.0, help="Fail when the UI takes longer (s) to answer")
+    parser.add_argument("--budget-ready", type=float, default=30.0, help="Fail when /readyz takes longer (s) to pass")
+    parser.add_argument("--top", type=int, default=25, help="Modules listed in the import profile")
+    parser.add_argument("--profile-only", action="store_true", help="Only profile the imports of app.py")
+    parser.add_argument("--output", help="Also write the report as JSON to this path")
+    return parser.parse_args(argv)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def app_environment(workdir):
+    env = dict(os.environ)
+    env.update({
+        "OPENAI_API_KEY": env.get("OPENAI_API_KEY", "sk-startup-benchmark"),
+        "EMBEDDING_PROVIDER": "hashing",
+        "KB_INDEX_DIR": os.path.join(workdir, "kb_index"),
+        "EMBEDDING_CACHE_PATH": os.path.join(workdir, "embeddings.sqlite"),
+        "USER_DB_PATH": os.path.join(workdir, "users.db"),
+        "LITELLM_LOCAL_MODEL_COST_MAP": "True",
+        "GRADIO_ANALYTICS_ENABLED": "False",
+        "OTEL_SDK_DISABLED": "true",
+        "CREWAI_TELEMETRY_OPT_OUT": "true",
+    })
+    return env
+
+
+def profile_imports(env):
+    """Runs `import app` under -X importtime; returns (total seconds, [(cumulative s, self s, depth, module)])."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=ROOT, env={**env, "METRICS_PORT": "0", "HEALTH_PORT": "0"}, capture_output=True, text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((int(cumulative_us) / 1e6, int(self_us) / 1e6, len(indent) // 2, module))
+    total = next((cumulative for cumulative, _, _, module in rows if module == "app"), None)
+    return total, rows
+
+
+def by_package(rows):
+    """Self import time summed per top-level package."""
+    packages = {}
+    for _, self_seconds, _, module in rows:
+        package = module.split(".")[0]
+        packages[package] = packages.get(package, 0.0) + self_seconds
+    return sorted(packages.items(), key=lambda item: -item[1])
+
+
+def wait_for(url, deadline, process, ok=(200,)):
+    """Polls url until it answers with one of `ok`; returns the time it did, or None on timeout or exit."""
+    while time.time() < deadline and process.poll() is None:
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                if response.status in ok:
+                    return time.perf_counter()
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.1)
+    return None
+
+
+def launch(env, timeout):
+    """Starts app.py once; returns seconds until the UI answers and until /readyz passes."""
+    ui_port, metrics_port, health_port = free_port(), free_port(), free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "app.py"], cwd=ROOT,
+        env={**env, "GRADIO_SERVER_PORT": str(ui_port), "METRICS_PORT": str(metrics_port), "HEALTH_PORT": str(health_port)},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.time() + timeout
+        ui = wait_for(f"http://127.0.0.1:{ui_port}/", deadline, process)
+        # The public probe listener, as an orchestrator would poll it
+        ready = wait_for(f"http://127.0.0.1:{health_port}/readyz", deadline, process)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return {
+        "ui_seconds": round(ui - started, 3) if ui else None,
+        "ready_seconds": round(ready - started, 3) if ready else None,
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    workdir = tempfile.mkdtemp(prefix="pulse-startup-")
+    env = app_environment(workdir)
+
+    total, rows = profile_imports(env)
+    print(f"import app: {total:.2f}s" if total is not None else "import app failed")
+    print(f"\n{'cumulative':>10} {'self':>7}  module")
+    for cumulative, self_seconds, depth, module in sorted(rows, reverse=True)[:args.top]:
+        print(f"{cumulative:>9.3f}s {self_seconds:>6.3f}s  {'  ' * depth}{module}")
+    packages = by_package(rows)
+    print(f"\n{'self':>8}  package")
+    for package, seconds in packages[:args.top]:
+        print(f"{seconds:>7.3f}s  {package}")
+    report = {
+        "import_seconds": total,
+        "imports": [{"module": m, "cumulative": c, "self": s} for c, s, _, m in sorted(rows, reverse=True)[:args.top]],
+        "packages": dict(packages[:args.top]),
+        "runs": [],
+    }
+
+    failed = False
+    if not args.profile_only:
+        print()
+        for i in range(args.runs):
+            run = {"index": "cold build" if i == 0 else "persisted", **launch(env, args.timeout)}
+            report["runs"].append(run)
+            ui, ready = run["ui_seconds"], run["ready_seconds"]
+            print(f"run {i + 1} ({run['index']}): UI up in {ui if ui is not None else 'timeout'}s, "
+                  f"ready in {ready if ready is not None else 'timeout'}s")
+            if ui is None or ui > args.budget_ui or ready is None or ready > args.budget_ready:
+                failed = True
+        ui_times = [r["ui_seconds"] for r in report["runs"] if r["ui_seconds"] is not None]
+        ready_times = [r["ready_seconds"] for r in report["runs"] if r["ready_seconds"] is not None]
+        if ui_times and ready_times:
+            print(f"median: UI {statistics.median(ui_times):.2f}s (budget {args.budget_ui}s), "
+                  f"ready {statistics.median(ready_times):.2f}s (budget {args.budget_ready}s)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), **report}, f, indent=2)
+    if failed:
+        print("\nFAIL: start-up exceeded its budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -25,7 +25,15 @@ if [ -n "$APP_REPO_URL" ]; then
     
     echo "Checking for dependency updates..."
     if [ -f "requirements.txt" ]; then
-        pip install --no-cache-dir -r requirements.txt
+        # Only reinstall when requirements.txt changed since the last successful install
+        REQ_STAMP="${REQUIREMENTS_STAMP:-/app/.requirements.sha256}"
+        REQ_HASH=$(sha256sum requirements.txt | cut -d' ' -f1)
+        if [ -f "$REQ_STAMP" ] && [ "$(cat "$REQ_STAMP")" = "$REQ_HASH" ]; then
+            echo "requirements.txt unchanged; skipping pip install."
+        else
+            pip install --no-cache-dir -r requirements.txt
+            echo "$REQ_HASH" > "$REQ_STAMP"
+        fi
     fi
     
     echo "Codebase synchronization and build complete."
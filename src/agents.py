@@ -1,15 +1,30 @@
+import threading
 from crewai import Agent
 from langchain_openai import ChatOpenAI
-from src.tools import policy_search_tool, fetch_user_details
+from src.tools import PolicySearchTool, FetchUserDetailsTool
 from src.logger import setup_logging
 
 logger = setup_logging()
 
+_llm = None
+_llm_lock = threading.Lock()
+
+def get_llm():
+    """
+    The process-wide ChatOpenAI client, created on first use. The streamed stages call it directly;
+    crewai Agents only read its settings and wrap them in an LLM of their own.
+    """
+    global _llm
+    with _llm_lock:
+        if _llm is None:
+            _llm = ChatOpenAI(model="gpt-4o", temperature=0)
+            logger.info("Initialized ChatOpenAI LLM")
+        return _llm
+
 class CustomerSupportAgents:
     def __init__(self):
         try:
-            self.llm = ChatOpenAI(model="gpt-4o", temperature=0)
-            logger.info("Initialized ChatOpenAI LLM")
+            self.llm = get_llm()
         except Exception as e:
             logger.error(f"Failed to initialize LLM: {e}")
             raise e
@@ -29,7 +44,29 @@ class CustomerSupportAgents:
             role='Information Retrieval Specialist',
             goal='Fetch relevant information from the Knowledge Base and User Database',
             backstory='You are responsible for finding verified information. 1. If the user identified themselves, use "User Details Tool" to fetch their profile. 2. Use "Policy Search Tool" to find answers to their specific question from the knowledge base. You consolidate all found data.',
-            tools=[policy_search_tool, fetch_user_details],
+            tools=[PolicySearchTool(), FetchUserDetailsTool()],
+            verbose=True,
+            allow_delegation=False,
+            llm=self.llm
+        )
+
+    def user_lookup_agent(self):
+        return Agent(
+            role='Account Lookup Specialist',
+            goal='Fetch the customer profile from the User Database when the customer identified themselves',
+            backstory='You look up customer accounts. If the conversation contains the customer\'s Name or Email, use "User Details Tool" to fetch their profile and return it unchanged. You never search the knowledge base.',
+            tools=[FetchUserDetailsTool()],
+            verbose=True,
+            allow_delegation=False,
+            llm=self.llm
+        )
+
+    def policy_retrieval_agent(self):
+        return Agent(
+            role='Policy Research Specialist',
+            goal='Fetch relevant information from the Knowledge Base',
+            backstory='You are responsible for finding verified information. Use "Policy Search Tool" to find answers to the customer\'s specific question from the knowledge base. You never look up customer accounts.',
+            tools=[PolicySearchTool()],
             verbose=True,
             allow_delegation=False,
             llm=self.llm
@@ -72,3 +109,13 @@ class CustomerSupportAgents:
             allow_delegation=False,
             llm=self.llm
         )
+
+    def compliance_tone_agent(self):
+        return Agent(
+            role='Compliance & Tone Editor',
+            goal='Fix compliance problems in a drafted response and give it a polite, professional, empathetic tone in a single pass',
+            backstory='You combine the duties of the Compliance & Quality Officer and the Tone & Empathy Specialist. You only receive drafts that failed an automated check. You remove leaked account details (price, billing dates, address) unless the customer specifically asked for them; only the plan name may be mentioned. You never add promises that violate policy. You keep the factual meaning otherwise, do NOT add signatures unless the conversation is clearly ending, and preserve the [CLOSE_CHAT] token at the end if present.',
+            verbose=True,
+            allow_delegation=False,
+            llm=self.llm
+        )
@@ -1,49 +1,242 @@
-from crewai import Crew, Process
-from src.agents import CustomerSupportAgents
-from src.tasks import CustomerSupportTasks
+import os
+import time
+from src.crew_pool import crew_pool
+from src.metrics import RequestTrace
+from src.streaming import STAGE_PROGRESS, get_stage, stream_stage
 from src.tools import PolicyKnowledgeBase
+from src.profile_cache import profile_cache
+from src.router import EMAIL_RE, ROUTE_FULL, ROUTE_GREETING, TEMPLATED_RESPONSES, classify_route, route_stats
+from src.validators import CLOSE_TOKEN, extract_profile, normalize_close_token, validate_response
 from src.logger import setup_logging
 
 logger = setup_logging()
 
+# "five_stage": intent -> retrieval -> generation -> QA -> tone, every turn (default).
+# "validated": intent -> retrieval -> generation, then local compliance/tone validators; a single
+# combined LLM rewrite runs only when a validator fails.
+PIPELINE_MODE = os.environ.get("CREW_PIPELINE_MODE", "five_stage").lower()
+
+PROGRESS_ORDER = list(dict.fromkeys(STAGE_PROGRESS.values()))
+
 class CustomerSupportCrew:
-    def __init__(self, query):
+    def __init__(self, query, message=None, session_id=None, lookup_query=None, route=None):
+        # query carries the conversation context; message is the raw current user message used for routing;
+        # lookup_query is the shorter context the intent and retrieval agents get (defaults to query);
+        # route is classify_route(message) when the caller already ran it
         self.query = query
+        self.message = message
+        self.route = route
+        self.session_id = session_id
+        self.lookup_query = lookup_query or query
+        self.profile = None
+        self.intent = None
+        self.llm_calls = 0
+        self.on_event = None
+        self._progress_rank = 0
+        self.trace = RequestTrace(session_id)
 
-    def run(self):
+    def run(self, on_event=None):
+        """
+        Answers the query. With on_event, the answer is streamed instead: on_event("progress", text)
+        is called as earlier stages finish, on_event("token", text) for each chunk of the final
+        stage, and the complete response text is returned.
+        """
         logger.info(f"Starting CustomerSupportCrew with query: {self.query}")
+        self.on_event = on_event
+        started = time.perf_counter()
+        route = self.route or (classify_route(self.message) if self.message is not None else ROUTE_FULL)
+        logger.info(f"Routing query to '{route}' pipeline.")
+        result = self._answer(route, started)
+        # A closed chat must not hand its customer's profile to the next conversation in the tab,
+        # whichever pipeline (or template) produced the goodbye
+        if CLOSE_TOKEN in str(result):
+            profile_cache.invalidate_session(self.session_id)
+        return result
+
+    def _answer(self, route, started):
+        if route in TEMPLATED_RESPONSES:
+            result = TEMPLATED_RESPONSES[route]
+            self._emit("token", result)
+            route_stats.record(route, time.perf_counter() - started, 0)
+            self.trace.finish(route)
+            return result
+
         try:
-            # Initialize Knowledge Base
-            PolicyKnowledgeBase.initialize()
-            
-            agents = CustomerSupportAgents()
-            tasks = CustomerSupportTasks()
-
-            # Create Agents
-            intent_agent = agents.intent_classification_agent()
-            retrieval_agent = agents.rag_retrieval_agent()
-            gen_agent = agents.response_generation_agent()
-            qa_agent = agents.quality_assurance_agent()
-            tone_agent = agents.tone_optimization_agent()
-
-            # Create Tasks
-            task1 = tasks.intent_classification_task(intent_agent, self.query)
-            task2 = tasks.retrieval_task(retrieval_agent, self.query)
-            task3 = tasks.response_generation_task(gen_agent, self.query)
-            task4 = tasks.quality_assurance_task(qa_agent)
-            task5 = tasks.tone_optimization_task(tone_agent)
-
-            # Create Crew
-            crew = Crew(
-                agents=[intent_agent, retrieval_agent, gen_agent, qa_agent, tone_agent],
-                tasks=[task1, task2, task3, task4, task5],
-                verbose=True,
-                process=Process.sequential
+            self.profile = self._session_profile()
+            if self.profile:
+                self.query += f"\nVerified customer profile (already looked up in this session):\n{self.profile}\n"
+
+            if route == ROUTE_GREETING:
+                result = self._run_greeting()
+            elif PIPELINE_MODE == "validated":
+                route = f"{route}_validated"
+                result = self._run_validated()
+            else:
+                result = self._run_full()
+        except Exception as e:
+            self.trace.finish(route, error=str(e))
+            raise e
+        route_stats.record(route, time.perf_counter() - started, self.llm_calls)
+        self.trace.finish(route)
+        return result
+
+    def _session_profile(self):
+        """The profile this session resolved earlier, unless the customer now gives a different e-mail."""
+        profile = profile_cache.get(self.session_id)
+        if self.session_id is not None:
+            self.trace.add_cache("profile", profile is not None)
+        if profile:
+            emails = {email.lower() for email in EMAIL_RE.findall(self.message or "")}
+            if emails and (profile.get("email") or "").lower() not in emails:
+                logger.info("Customer gave a different e-mail; dropping the cached session profile.")
+                profile_cache.invalidate_session(self.session_id)
+                return None
+        return profile
+
+    def _pipeline(self, name):
+        return f"{name}_identified" if self.profile else name
+
+    def _profile_resolved(self, profile):
+        if self.profile is None:
+            self.profile = profile
+        profile_cache.put(self.session_id, profile)
+
+    def _emit(self, kind, text):
+        if self.on_event is not None:
+            self.on_event(kind, text)
+
+    def _report_progress(self, output):
+        message = STAGE_PROGRESS.get(getattr(output, "agent", None))
+        if not message:
+            return
+        # Concurrent stages finish in any order; never step back to an earlier message
+        rank = PROGRESS_ORDER.index(message)
+        if rank > self._progress_rank:
+            self._progress_rank = rank
+            self._emit("progress", message)
+
+    def _kickoff(self, pipeline, **inputs):
+        """Runs a pooled crew with this request's inputs, tracing each stage and counting the LLM calls it made."""
+        crew = pipeline.crew
+        # Agents are reused across requests, so their usage and retry counters are cumulative
+        before = {id(agent): self._agent_counters(pipeline, agent) for agent in crew.agents}
+        pipeline.listener = self._report_progress if self.on_event else None
+        pipeline.profile_listener = self._profile_resolved
+        pipeline.tool_listener = self.trace.add_tool
+        try:
+            result = crew.kickoff(inputs={**self._inputs(), **inputs})
+        finally:
+            pipeline.listener = None
+            pipeline.profile_listener = None
+            pipeline.tool_listener = None
+            self._trace_stages(pipeline, before)
+        intent_task = pipeline.tasks.get("intent")
+        if intent_task is not None and intent_task.output is not None:
+            self.intent = intent_task.output.raw
+        return result
+
+    @staticmethod
+    def _agent_counters(pipeline, agent):
+        return pipeline.meters[id(agent)].snapshot() + (agent._times_executed,)
+
+    def _trace_stages(self, pipeline, before):
+        for task in pipeline.crew.tasks:
+            agent = task.agent
+            calls, prompt, completion, retries = (
+                now - then for now, then in zip(self._agent_counters(pipeline, agent), before[id(agent)])
             )
+            self.llm_calls += calls
+            self.trace.add_stage(
+                agent.role,
+                getattr(task, "_execution_time", None) if task.output is not None else None,
+                llm_calls=calls,
+                prompt_tokens=prompt,
+                completion_tokens=completion,
+                retries=retries,
+            )
+
+    def _inputs(self):
+        return {"customer_query": self.query, "lookup_query": self.lookup_query}
+
+    def _stream(self, stage, context="", **inputs):
+        """Runs the final stage as one streamed LLM call and returns the full text."""
+        started = time.perf_counter()
+        chunks = []
+        usage = {}
+        for chunk in stream_stage(stage, context, {**self._inputs(), **inputs}, usage):
+            chunks.append(chunk)
+            self._emit("token", chunk)
+        self.llm_calls += 1
+        text = "".join(chunks)
+        self.trace.add_stage(
+            get_stage(stage)[0].role,
+            time.perf_counter() - started,
+            llm_calls=1,
+            prompt_tokens=usage["input_tokens"],
+            completion_tokens=usage["output_tokens"],
+        )
+        return text
 
-            result = crew.kickoff()
+    def _run_greeting(self):
+        """Small talk needs neither retrieval nor QA: a single response agent answers it."""
+        try:
+            if self.on_event:
+                return self._stream("greeting")
+            with crew_pool.acquire("greeting") as pipeline:
+                result = self._kickoff(pipeline)
+            logger.info("Greeting crew execution completed successfully.")
+            return result
+        except Exception as e:
+            logger.error(f"Error executing greeting crew: {e}")
+            raise e
+
+    def _run_full(self):
+        try:
+            # Never wait for the Knowledge Base here; the policy tool reports it as loading until ready
+            PolicyKnowledgeBase.warm_up()
+
+            if self.on_event:
+                # Everything up to QA runs in the crew; the tone pass is streamed token by token
+                self._emit("progress", STAGE_PROGRESS[None])
+                with crew_pool.acquire(self._pipeline("review")) as pipeline:
+                    reviewed = self._kickoff(pipeline)
+                    draft = pipeline.tasks["generation"].output
+                # QA either approves the draft or returns a corrected version; tone sees both
+                context = f"Drafted response:\n{draft.raw if draft else ''}\n\nCompliance review:\n{reviewed.raw}"
+                result = self._stream("tone", context)
+            else:
+                with crew_pool.acquire(self._pipeline("five_stage")) as pipeline:
+                    result = self._kickoff(pipeline)
             logger.info("Crew execution completed successfully.")
             return result
         except Exception as e:
             logger.error(f"Error executing crew: {e}")
             raise e
+
+    def _run_validated(self):
+        """Draft with three agents, check locally, and spend one more LLM call only if the draft fails."""
+        try:
+            PolicyKnowledgeBase.warm_up()
+
+            self._emit("progress", STAGE_PROGRESS[None])
+            with crew_pool.acquire(self._pipeline("draft")) as pipeline:
+                draft = normalize_close_token(self._kickoff(pipeline).raw)
+                retrieval_output = pipeline.tasks["retrieval"].output
+
+            profile = self.profile or extract_profile(retrieval_output.raw if retrieval_output else None)
+            issues = validate_response(draft, profile, self.message or self.query)
+            if not issues:
+                logger.info("Draft passed local validation; skipping QA and tone agents.")
+                self._emit("token", draft)
+                return draft
+
+            logger.info(f"Draft failed local validation ({'; '.join(issues)}); running combined rewrite.")
+            issue_list = "\n".join(f"- {issue}" for issue in issues)
+            if self.on_event:
+                return normalize_close_token(self._stream("rewrite", draft=draft, issues=issue_list))
+            with crew_pool.acquire("rewrite") as pipeline:
+                result = self._kickoff(pipeline, draft=draft, issues=issue_list)
+            return normalize_close_token(result.raw)
+        except Exception as e:
+            logger.error(f"Error executing validated crew: {e}")
+            raise e
@@ -0,0 +1,259 @@
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from functools import partial
+from crewai import Crew, Process
+from src.agents import CustomerSupportAgents
+from src.tasks import CustomerSupportTasks
+from src.tools import FetchUserDetailsTool, TracedTool
+from src.metrics import LLMMeter
+from src.logger import capture_library_output, setup_logging
+
+logger = setup_logging()
+# verbose=True agents print on the request thread; route that (and litellm's logs) through the logging queue
+capture_library_output()
+
+# Crews per pipeline that may run at the same time; a request waits for a free one beyond that
+CREW_POOL_SIZE = int(os.environ.get("CREW_POOL_SIZE", "16"))
+
+# "sequential": every stage runs after the previous one (default).
+# "dag": stages that only need the raw query run concurrently; see _front_stages.
+CREW_PROCESS = os.environ.get("CREW_PROCESS", "sequential").lower()
+
+# Task descriptions are built once with these placeholders; crewai fills them in at kickoff(inputs=...).
+# QUERY is the full conversation context for the response agent; LOOKUP_QUERY is the short slice
+# (facts plus the last exchange) the intent, retrieval and rewrite agents work from.
+QUERY = "{customer_query}"
+LOOKUP_QUERY = "{lookup_query}"
+DRAFT = "{draft}"
+ISSUES = "{issues}"
+
+
+class PipelineCrew:
+    """
+    A ready-to-run crew plus named handles on the tasks whose outputs the caller reads.
+    The request holding the crew may set `listener`, called with each finished TaskOutput,
+    `profile_listener`, called with each customer profile the crew's User Details Tools resolve,
+    and `tool_listener`, called with (tool name, seconds, status) for every tool call. Every agent
+    has its own tool instances, so what they report belongs to this crew's request.
+    """
+
+    def __init__(self, crew, tasks):
+        self.crew = crew
+        self.tasks = tasks
+        self.listener = None
+        self.profile_listener = None
+        self.tool_listener = None
+        crew.task_callback = self._task_done
+        self.meters = {id(agent): LLMMeter(agent.llm) for agent in crew.agents}
+        for agent in crew.agents:
+            for tool in agent.tools or []:
+                if isinstance(tool, TracedTool):
+                    tool.tracer = self._tool_used
+                if isinstance(tool, FetchUserDetailsTool):
+                    tool.listener = self._profile_found
+
+    def _task_done(self, output):
+        if self.listener is not None:
+            self.listener(output)
+
+    def _tool_used(self, name, seconds, status):
+        if self.tool_listener is not None:
+            self.tool_listener(name, seconds, status)
+
+    def _profile_found(self, profile):
+        if self.profile_listener is not None:
+            self.profile_listener(profile)
+
+
+def _front_stages(agents, tasks, identified=False):
+    """
+    Intent, retrieval and generation: the stages every full pipeline starts with. Returns the
+    agents, the tasks in crew order and the named task handles. For an identified session the
+    profile is already part of the query, so retrieval only searches the policies.
+
+    In "dag" mode intent classification, user lookup and policy search depend only on the raw
+    query, so they run concurrently as async tasks and generation waits on their three outputs
+    (crewai joins pending async tasks before the next synchronous one). The turn then takes as
+    long as the slowest of the three instead of their sum.
+    """
+    intent_agent = agents.intent_classification_agent()
+    gen_agent = agents.response_generation_agent()
+    task1 = tasks.intent_classification_task(intent_agent, LOOKUP_QUERY)
+    task3 = tasks.response_generation_task(gen_agent, QUERY)
+
+    if identified:
+        policy_agent = agents.policy_retrieval_agent()
+        policy_task = tasks.policy_retrieval_task(policy_agent, LOOKUP_QUERY)
+        if CREW_PROCESS == "dag":
+            task1.async_execution = True
+            task3.context = [task1, policy_task]
+        else:
+            policy_task.async_execution = False
+        return (
+            [intent_agent, policy_agent, gen_agent],
+            [task1, policy_task, task3],
+            {"intent": task1, "retrieval": policy_task, "generation": task3},
+        )
+
+    if CREW_PROCESS == "dag":
+        lookup_agent = agents.user_lookup_agent()
+        policy_agent = agents.policy_retrieval_agent()
+        lookup_task = tasks.user_lookup_task(lookup_agent, LOOKUP_QUERY)
+        policy_task = tasks.policy_retrieval_task(policy_agent, LOOKUP_QUERY)
+        task1.async_execution = True
+        task3.context = [task1, lookup_task, policy_task]
+        return (
+            [intent_agent, lookup_agent, policy_agent, gen_agent],
+            [task1, lookup_task, policy_task, task3],
+            {"intent": task1, "retrieval": lookup_task, "generation": task3},
+        )
+
+    retrieval_agent = agents.rag_retrieval_agent()
+    task2 = tasks.retrieval_task(retrieval_agent, LOOKUP_QUERY)
+    return (
+        [intent_agent, retrieval_agent, gen_agent],
+        [task1, task2, task3],
+        {"intent": task1, "retrieval": task2, "generation": task3},
+    )
+
+
+def build_five_stage(agents, tasks, identified=False):
+    front_agents, front_tasks, handles = _front_stages(agents, tasks, identified)
+    qa_agent = agents.quality_assurance_agent()
+    tone_agent = agents.tone_optimization_agent()
+
+    task4 = tasks.quality_assurance_task(qa_agent)
+    task5 = tasks.tone_optimization_task(tone_agent)
+
+    crew = Crew(
+        agents=front_agents + [qa_agent, tone_agent],
+        tasks=front_tasks + [task4, task5],
+        verbose=True,
+        process=Process.sequential
+    )
+    return PipelineCrew(crew, handles)
+
+
+def build_review(agents, tasks, identified=False):
+    """The five-stage crew without its final tone pass, which is streamed separately."""
+    front_agents, front_tasks, handles = _front_stages(agents, tasks, identified)
+    qa_agent = agents.quality_assurance_agent()
+
+    task4 = tasks.quality_assurance_task(qa_agent)
+
+    crew = Crew(
+        agents=front_agents + [qa_agent],
+        tasks=front_tasks + [task4],
+        verbose=True,
+        process=Process.sequential
+    )
+    return PipelineCrew(crew, handles)
+
+
+def build_draft(agents, tasks, identified=False):
+    front_agents, front_tasks, handles = _front_stages(agents, tasks, identified)
+
+    crew = Crew(
+        agents=front_agents,
+        tasks=front_tasks,
+        verbose=True,
+        process=Process.sequential
+    )
+    return PipelineCrew(crew, handles)
+
+
+def build_rewrite(agents, tasks):
+    editor = agents.compliance_tone_agent()
+    crew = Crew(
+        agents=[editor],
+        tasks=[tasks.compliance_rewrite_task(editor, LOOKUP_QUERY, DRAFT, ISSUES)],
+        verbose=True,
+        process=Process.sequential
+    )
+    return PipelineCrew(crew, {})
+
+
+def build_greeting(agents, tasks):
+    gen_agent = agents.response_generation_agent()
+    crew = Crew(
+        agents=[gen_agent],
+        tasks=[tasks.greeting_task(gen_agent, QUERY)],
+        verbose=True,
+        process=Process.sequential
+    )
+    return PipelineCrew(crew, {})
+
+
+PIPELINE_BUILDERS = {
+    "five_stage": build_five_stage,
+    "review": build_review,
+    "draft": build_draft,
+    # Same pipelines for sessions whose customer profile is already cached: no user lookup
+    "five_stage_identified": partial(build_five_stage, identified=True),
+    "review_identified": partial(build_review, identified=True),
+    "draft_identified": partial(build_draft, identified=True),
+    "rewrite": build_rewrite,
+    "greeting": build_greeting,
+}
+
+
+class CrewPool:
+    """
+    Process-wide pools of pre-built crews, one pool per pipeline. Agents, tasks and crews are
+    built once per slot and reused. Each agent keeps the crewai LLM wrapper it builds from the
+    shared ChatOpenAI settings (the per-agent LLMMeter depends on that); litellm reuses one cached
+    OpenAI client, and with it the HTTP connections, for all of them. A crew is checked
+    out by one request at a time (crewai keeps per-run state on tasks), and only the
+    per-request inputs are bound at kickoff.
+    """
+
+    def __init__(self, size=CREW_POOL_SIZE):
+        self.size = size
+        self._lock = threading.Lock()
+        self._idle = {name: queue.LifoQueue() for name in PIPELINE_BUILDERS}
+        self._created = {name: 0 for name in PIPELINE_BUILDERS}
+        self._agents = None
+        self._tasks = CustomerSupportTasks()
+
+    def _build(self, pipeline):
+        with self._lock:
+            if self._agents is None:
+                self._agents = CustomerSupportAgents()
+        pipeline_crew = PIPELINE_BUILDERS[pipeline](self._agents, self._tasks)
+        logger.info(f"Built '{pipeline}' crew ({self._created[pipeline]}/{self.size}).")
+        return pipeline_crew
+
+    @contextmanager
+    def acquire(self, pipeline):
+        idle = self._idle[pipeline]
+        try:
+            pipeline_crew = idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_build = self._created[pipeline] < self.size
+                if can_build:
+                    self._created[pipeline] += 1
+            if can_build:
+                try:
+                    pipeline_crew = self._build(pipeline)
+                except Exception:
+                    with self._lock:
+                        self._created[pipeline] -= 1
+                    raise
+            else:
+                pipeline_crew = idle.get()
+        try:
+            yield pipeline_crew
+        finally:
+            idle.put(pipeline_crew)
+
+    def warm_up(self, pipelines=("five_stage",)):
+        """Builds one crew per pipeline ahead of the first request."""
+        for pipeline in pipelines:
+            with self.acquire(pipeline):
+                pass
+
+
+crew_pool = CrewPool()
@@ -1,18 +1,47 @@
-import sqlite3
+import argparse
+import csv
+import json
 import os
+import random
+import sqlite3
+import time
 from datetime import datetime, timedelta
+from itertools import islice
 
 DB_PATH = os.path.join(os.path.dirname(__file__), '../data/users.db')
 
-def init_db():
-    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # Create Table
-    cursor.execute('DROP TABLE IF EXISTS users')
-    cursor.execute('''
-        CREATE TABLE users (
+USER_COLUMNS = (
+    'username', 'email', 'address', 'phone', 'service_opted', 'plan', 'start_date', 'end_date',
+    'monthly_cost', 'dues', 'next_billing_date', 'billing_cycle',
+)
+NUMERIC_COLUMNS = ('monthly_cost', 'dues')
+EMAIL_INDEX = 'idx_users_email_nocase'
+BATCH_SIZE = 10000
+
+SEED_USERS = [
+    (
+        'John Doe', 'john.doe@example.com', '123 Pulse Ave, Tech City', '555-0101',
+        'Broadband', 'Pulse GigaFiber', '2025-01-01', '2026-01-01',
+        99.99, 0.0, '2025-02-01', 'Monthly'
+    ),
+    (
+        'Jane Smith', 'jane.smith@example.com', '456 Signal St, Data Town', '555-0102',
+        'Mobile', 'Pulse Unlimited 5G', '2024-06-15', '2025-06-15',
+        49.99, 49.99, '2025-02-15', 'Monthly'
+    ),
+    (
+        'Bob Jones', 'bob.jones@example.com', '789 Node Rd, Server Valley', '555-0103',
+        'Broadband', 'Pulse Home Basic', '2023-11-20', '2024-11-20',
+        39.99, 120.00, '2024-12-20', 'Monthly'
+    )
+]
+
+_INSERT = f"INSERT OR REPLACE INTO users ({', '.join(USER_COLUMNS)}) VALUES ({', '.join('?' * len(USER_COLUMNS))})"
+
+
+def create_schema(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS users (
             username TEXT PRIMARY KEY,
             email TEXT,
             address TEXT,
@@ -27,33 +56,184 @@ def init_db():
             billing_cycle TEXT
         )
     ''')
-    
-    # Seed Data
-    users = [
-        (
-            'John Doe', 'john.doe@example.com', '123 Pulse Ave, Tech City', '555-0101', 
-            'Broadband', 'Pulse GigaFiber', '2025-01-01', '2026-01-01', 
-            99.99, 0.0, '2025-02-01', 'Monthly'
-        ),
-        (
-            'Jane Smith', 'jane.smith@example.com', '456 Signal St, Data Town', '555-0102', 
-            'Mobile', 'Pulse Unlimited 5G', '2024-06-15', '2025-06-15', 
-            49.99, 49.99, '2025-02-15', 'Monthly'
-        ),
-        (
-            'Bob Jones', 'bob.jones@example.com', '789 Node Rd, Server Valley', '555-0103', 
-            'Broadband', 'Pulse Home Basic', '2023-11-20', '2024-11-20', 
-            39.99, 120.00, '2024-12-20', 'Monthly'
-        )
-    ]
-    
-    cursor.executemany('''
-        INSERT INTO users VALUES (?,?,?,?,?,?,?,?,?,?,?,?)
-    ''', users)
-    
     conn.commit()
+
+def ensure_indexes(conn):
+    """Lookups match the e-mail case-insensitively; without this index they scan the whole table."""
+    conn.execute(f'CREATE INDEX IF NOT EXISTS {EMAIL_INDEX} ON users (email COLLATE NOCASE)')
+    conn.commit()
+
+def init_db(db_path=DB_PATH, reset=False):
+    """
+    Creates the users table and its indexes if missing and makes sure the demo customers exist.
+    Safe to run any number of times: existing customers are kept unless reset is set.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    if reset:
+        conn.execute('DROP TABLE IF EXISTS users')
+    create_schema(conn)
+    added = conn.executemany(
+        f"INSERT OR IGNORE INTO users ({', '.join(USER_COLUMNS)}) VALUES ({', '.join('?' * len(USER_COLUMNS))})",
+        SEED_USERS,
+    ).rowcount
+    conn.commit()
+    ensure_indexes(conn)
+    total = conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
     conn.close()
-    print(f"Database initialized at {DB_PATH} with {len(users)} users.")
+    print(f"Database initialized at {db_path}: {total} users ({added} demo users added).")
+
+
+def _to_row(record):
+    row = []
+    for column in USER_COLUMNS:
+        value = record.get(column)
+        if value == '':
+            value = None
+        if column in NUMERIC_COLUMNS and value is not None:
+            value = float(value)
+        row.append(value)
+    if not row[0]:
+        raise ValueError(f"Record without username: {record}")
+    return tuple(row)
+
+def read_records(path, fmt=None):
+    """Streams customer records (dicts) from a CSV file with a header row or from a JSONL file."""
+    fmt = fmt or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+        elif fmt == 'jsonl':
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            raise ValueError(f"Unknown format '{fmt}'; expected csv or jsonl.")
+
+def load_records(records, db_path=DB_PATH, batch_size=BATCH_SIZE):
+    """
+    Bulk-loads customer records into the users table, upserting on username. Rows are inserted with
+    executemany in one transaction per batch, with durability relaxed for the duration of the load,
+    and the e-mail index is rebuilt once at the end instead of being maintained row by row.
+    Returns the number of records loaded.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    create_schema(conn)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=OFF')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    conn.execute('PRAGMA cache_size=-262144')
+    conn.execute(f'DROP INDEX IF EXISTS {EMAIL_INDEX}')
+
+    started = time.perf_counter()
+    loaded = 0
+    rows = (_to_row(record) for record in records)
+    try:
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            conn.execute('BEGIN')
+            try:
+                conn.executemany(_INSERT, batch)
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            loaded += len(batch)
+            if loaded % (batch_size * 10) == 0:
+                print(f"  {loaded} rows loaded ({loaded / (time.perf_counter() - started):.0f} rows/s)")
+    finally:
+        ensure_indexes(conn)
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA optimize')
+        conn.close()
+    print(f"Loaded {loaded} users into {db_path} in {time.perf_counter() - started:.1f}s.")
+    return loaded
+
+
+FIRST_NAMES = ['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David', 'Elizabeth',
+               'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah', 'Priya', 'Wei']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez',
+              'Hernandez', 'Lopez', 'Wilson', 'Anderson', 'Taylor', 'Thomas', 'Moore', 'Jackson', 'Patel', 'Chen']
+STREETS = ['Pulse Ave', 'Signal St', 'Node Rd', 'Fiber Ln', 'Packet Way', 'Router Blvd', 'Antenna Ct', 'Cable Dr']
+CITIES = ['Tech City', 'Data Town', 'Server Valley', 'Bandwidth Bay', 'Latency Lake']
+PLANS = {
+    'Broadband': [('Pulse Home Basic', 39.99), ('Pulse GigaFiber', 99.99), ('Pulse Fibre 2G', 129.99)],
+    'Mobile': [('Starter 4G', 15.0), ('Pulse Unlimited 5G', 49.99), ('Pulse Family 5G', 89.99)],
+}
+
+def generate_users(count, seed=0):
+    """Yields count synthetic, unique customer records; the same seed yields the same customers."""
+    rng = random.Random(seed)
+    epoch = datetime(2022, 1, 1)
+    for i in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        service = rng.choice(list(PLANS))
+        plan, cost = rng.choice(PLANS[service])
+        start = epoch + timedelta(days=rng.randrange(1400))
+        yield {
+            'username': f"{first} {last} {i:07d}",
+            'email': f"{first}.{last}.{i}@example.com".lower(),
+            'address': f"{rng.randint(1, 999)} {rng.choice(STREETS)}, {rng.choice(CITIES)}",
+            'phone': f"555-{i % 10000:04d}",
+            'service_opted': service,
+            'plan': plan,
+            'start_date': start.strftime('%Y-%m-%d'),
+            'end_date': (start + timedelta(days=365)).strftime('%Y-%m-%d'),
+            'monthly_cost': cost,
+            'dues': rng.choice([0.0, 0.0, 0.0, cost, cost * 2]),
+            'next_billing_date': (start + timedelta(days=30 * rng.randint(1, 12))).strftime('%Y-%m-%d'),
+            'billing_cycle': 'Monthly',
+        }
+
+def write_records(records, path, fmt=None):
+    """Writes records to a CSV or JSONL file, streaming."""
+    fmt = fmt or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+    written = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=USER_COLUMNS) if fmt == 'csv' else None
+        if writer:
+            writer.writeheader()
+        for record in records:
+            if writer:
+                writer.writerow(record)
+            else:
+                f.write(json.dumps(record) + '\n')
+            written += 1
+    print(f"Wrote {written} users to {path}.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Create, seed and bulk-load the customer database.")
+    parser.add_argument('--db', default=DB_PATH, help="Database file (default: data/users.db)")
+    commands = parser.add_subparsers(dest='command')
+
+    init = commands.add_parser('init', help="Create the schema and demo customers (default command)")
+    init.add_argument('--reset', action='store_true', help="Drop all existing customers first")
+
+    load = commands.add_parser('import', help="Bulk-load customers from a CSV or JSONL file")
+    load.add_argument('path')
+    load.add_argument('--format', choices=['csv', 'jsonl'], help="Defaults to the file extension")
+    load.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    generate = commands.add_parser('generate', help="Generate synthetic customers into the database or a file")
+    generate.add_argument('count', type=int)
+    generate.add_argument('--seed', type=int, default=0)
+    generate.add_argument('--output', help="Write a CSV/JSONL file instead of loading the database")
+    generate.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    args = parser.parse_args(argv)
+    if args.command == 'import':
+        load_records(read_records(args.path, args.format), args.db, args.batch_size)
+    elif args.command == 'generate':
+        if args.output:
+            write_records(generate_users(args.count, args.seed), args.output)
+        else:
+            load_records(generate_users(args.count, args.seed), args.db, args.batch_size)
+    else:
+        init_db(args.db, reset=getattr(args, 'reset', False))
 
 if __name__ == "__main__":
-    init_db()
+    main()
@@ -0,0 +1,136 @@
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from src.embeddings import normalize_text, text_hash
+from src.logger import setup_logging
+from src.memory import count_tokens
+from src.metrics import EMBEDDING_CHUNKS, EMBEDDING_RETRIES
+
+logger = setup_logging()
+
+# Index builds send chunks in batches of at most EMBED_BATCH_SIZE chunks and EMBED_BATCH_TOKENS
+# tokens (the OpenAI API rejects requests over 300k tokens), EMBED_CONCURRENCY requests at a time
+EMBED_BATCH_SIZE = int(os.environ.get("EMBED_BATCH_SIZE", "256"))
+EMBED_BATCH_TOKENS = int(os.environ.get("EMBED_BATCH_TOKENS", "100000"))
+EMBED_CONCURRENCY = int(os.environ.get("EMBED_CONCURRENCY", "4"))
+EMBED_MAX_RETRIES = int(os.environ.get("EMBED_MAX_RETRIES", "6"))
+EMBED_BACKOFF_BASE = float(os.environ.get("EMBED_BACKOFF_BASE", "1.0"))
+EMBED_BACKOFF_MAX = float(os.environ.get("EMBED_BACKOFF_MAX", "60"))
+EMBED_PROGRESS_INTERVAL = float(os.environ.get("EMBED_PROGRESS_INTERVAL", "10"))
+
+RETRYABLE_STATUS = (408, 409, 429, 500, 502, 503, 504)
+RETRYABLE_ERRORS = ("RateLimitError", "APITimeoutError", "APIConnectionError", "InternalServerError", "Timeout", "ConnectionError")
+
+
+def token_batches(items, max_chunks=EMBED_BATCH_SIZE, max_tokens=EMBED_BATCH_TOKENS):
+    """Groups (key, text) pairs into batches under both limits; an oversized text gets a batch of its own."""
+    batch, batch_tokens = [], 0
+    for key, text in items:
+        tokens = count_tokens(text)
+        if batch and (len(batch) >= max_chunks or batch_tokens + tokens > max_tokens):
+            yield batch
+            batch, batch_tokens = [], 0
+        batch.append((key, text))
+        batch_tokens += tokens
+    if batch:
+        yield batch
+
+
+def retry_delay(error, attempt):
+    """Seconds to wait before retrying a rate-limited or transient failure, or None if it is not retryable."""
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    if status not in RETRYABLE_STATUS and type(error).__name__ not in RETRYABLE_ERRORS:
+        return None
+    headers = getattr(response, "headers", None) or {}
+    try:
+        # Honour the server's Retry-After when a 429 carries one
+        return min(float(headers.get("retry-after")), EMBED_BACKOFF_MAX)
+    except (TypeError, ValueError):
+        pass
+    # Exponential backoff with full jitter, so concurrent batches do not retry in lockstep
+    return random.uniform(0, min(EMBED_BACKOFF_MAX, EMBED_BACKOFF_BASE * 2 ** attempt))
+
+
+def _embed_batch(backend, texts):
+    attempt = 0
+    while True:
+        try:
+            return backend.embed_documents(texts)
+        except Exception as e:
+            delay = retry_delay(e, attempt)
+            if delay is None or attempt >= EMBED_MAX_RETRIES:
+                raise e
+            attempt += 1
+            EMBEDDING_RETRIES.inc()
+            logger.warning(f"Embedding batch of {len(texts)} failed ({type(e).__name__}: {e}); retry {attempt}/{EMBED_MAX_RETRIES} in {delay:.1f}s.")
+            time.sleep(delay)
+
+
+def embed_documents(embeddings, texts):
+    """
+    Embeds the chunks of an index build in token-aware batches, EMBED_CONCURRENCY at a time,
+    retrying rate limits and transient errors with backoff.
+    When `embeddings` is wrapped with the embedding cache, every finished batch is written to it
+    straight away, so a build that fails or is interrupted resumes from the completed batches.
+    """
+    started = time.perf_counter()
+    cache = getattr(embeddings, "cache", None)
+    if cache is not None:
+        backend, model = embeddings.underlying, embeddings.model
+        texts = [normalize_text(t) for t in texts]
+        keys = [text_hash(t) for t in texts]
+        vectors = cache.get_many(model, keys)
+    else:
+        backend, model = embeddings, None
+        keys = list(range(len(texts)))
+        vectors = {}
+
+    pending = {}
+    for key, text in zip(keys, texts):
+        if key not in vectors and key not in pending:
+            pending[key] = text
+    resumed = len(vectors)
+    EMBEDDING_CHUNKS.inc(resumed, source="checkpoint")
+    batches = list(token_batches(pending.items()))
+
+    done = 0
+    failure = None
+    last_report = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(EMBED_CONCURRENCY, len(batches)))) as pool:
+        futures = {pool.submit(_embed_batch, backend, [text for _, text in batch]): batch for batch in batches}
+        for future in as_completed(futures):
+            if future.cancelled():
+                continue
+            batch = futures[future]
+            try:
+                items = list(zip((key for key, _ in batch), future.result()))
+            except Exception as e:
+                if failure is None:
+                    failure = e
+                    # Stop queueing work; batches already running still finish and are checkpointed
+                    for other in futures:
+                        other.cancel()
+                continue
+            if cache is not None:
+                cache.put_many(model, items)
+            vectors.update(items)
+            done += len(items)
+            EMBEDDING_CHUNKS.inc(len(items), source="api")
+            if time.perf_counter() - last_report >= EMBED_PROGRESS_INTERVAL:
+                last_report = time.perf_counter()
+                rate = done / (last_report - started)
+                logger.info(f"Embedded {done}/{len(pending)} chunks ({rate:.1f} chunks/s).")
+
+    seconds = time.perf_counter() - started
+    if failure is not None:
+        saved = "kept in the embedding cache" if cache is not None else "lost (no embedding cache to resume from)"
+        logger.error(f"Embedding stopped after {done}/{len(pending)} chunks in {seconds:.1f}s; completed batches are {saved}.")
+        raise failure
+    if pending:
+        logger.info(
+            f"Embedded {done} chunks in {len(batches)} batches in {seconds:.1f}s ({done / seconds:.1f} chunks/s); "
+            f"{resumed} reused from the cache."
+        )
+    return [vectors[key] for key in keys]
@@ -0,0 +1,288 @@
+import hashlib
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+import zlib
+from array import array
+from langchain_core.embeddings import Embeddings
+from src.logger import setup_logging
+from src.metrics import CACHE_LOOKUPS
+
+logger = setup_logging()
+
+# "openai" (default), "hashing" (CPU-only, offline) or "huggingface" (local sentence-transformers model)
+EMBEDDING_PROVIDER = os.environ.get("EMBEDDING_PROVIDER", "openai").lower()
+OPENAI_EMBEDDING_MODEL = os.environ.get("OPENAI_EMBEDDING_MODEL", "text-embedding-ada-002")
+# Token-aware chunking of long inputs needs tiktoken's data files; turn off to send raw text
+OPENAI_EMBEDDING_CHECK_CTX_LENGTH = os.environ.get("OPENAI_EMBEDDING_CHECK_CTX_LENGTH", "true").lower() in ("1", "true", "yes")
+HASHING_DIM = int(os.environ.get("HASHING_EMBEDDING_DIM", "512"))
+LOCAL_EMBEDDING_MODEL = os.environ.get("LOCAL_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+
+# Set EMBEDDING_CACHE_PATH to an empty string to disable the cache
+CACHE_PATH = os.environ.get("EMBEDDING_CACHE_PATH", ".embedding_cache.sqlite")
+CACHE_MAX_ENTRIES = int(os.environ.get("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+CACHE_MAX_MB = float(os.environ.get("EMBEDDING_CACHE_MAX_MB", "512"))
+
+
+def normalize_text(text):
+    """Canonical form used both as the cache key and as the text sent to the backend."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.$'-][a-z0-9]+)*")
+
+
+def tokenize(text):
+    """Lower-cased word tokens; keeps things like "5g", "99.99" and "e-mail" whole."""
+    return TOKEN_RE.findall(text.lower())
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Deterministic, CPU-only embeddings: unigrams and bigrams are hashed into `dim` signed
+    buckets with sublinear term frequency, then L2-normalized. Needs no model download or
+    network, so the index and search paths can run (and be benchmarked) fully offline.
+    """
+
+    def __init__(self, dim=HASHING_DIM):
+        self.dim = dim
+        self.model = f"hashing-{dim}"
+
+    def _embed(self, text):
+        tokens = tokenize(text)
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        counts = {}
+        for feature in features:
+            h = zlib.crc32(feature.encode("utf-8"))
+            bucket = h % self.dim
+            sign = 1.0 if (h >> 31) & 1 else -1.0
+            counts[bucket] = counts.get(bucket, 0.0) + sign
+        vector = [0.0] * self.dim
+        for bucket, value in counts.items():
+            if value:
+                vector[bucket] = math.copysign(1.0 + math.log(abs(value)), value)
+        norm = math.sqrt(sum(v * v for v in vector))
+        return [v / norm for v in vector] if norm else vector
+
+    def embed_documents(self, texts):
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+class EmbeddingCache:
+    """
+    Persistent (model, text hash) -> vector store backed by SQLite.
+    Entries are evicted least-recently-used first once the cache holds more than
+    max_entries vectors or max_bytes of vector data. 0 disables a limit.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_entries=CACHE_MAX_ENTRIES, max_bytes=int(CACHE_MAX_MB * 1024 * 1024)):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+        ''')
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        self._conn.commit()
+        self._entries, self._bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+        ).fetchone()
+
+    def get_many(self, model, hashes):
+        """Returns {hash: vector} for the hashes present in the cache and marks them as used."""
+        if not hashes:
+            return {}
+        found = {}
+        with self._lock:
+            unique = list(dict.fromkeys(hashes))
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model=? AND text_hash IN ({placeholders})",
+                    [model, *batch],
+                ).fetchall()
+                for h, blob in rows:
+                    found[h] = array("f", blob).tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used=? WHERE model=? AND text_hash=?",
+                    [(now, model, h) for h in found],
+                )
+                self._conn.commit()
+            hits = sum(1 for h in hashes if h in found)
+            self.hits += hits
+            self.misses += len(hashes) - hits
+        CACHE_LOOKUPS.inc(hits, cache="embedding", result="hit")
+        CACHE_LOOKUPS.inc(len(hashes) - hits, cache="embedding", result="miss")
+        return found
+
+    def put_many(self, model, items):
+        """Stores (hash, vector) pairs, then evicts down to the configured limits."""
+        if not items:
+            return
+        with self._lock:
+            now = time.time()
+            for h, vector in items:
+                blob = array("f", vector).tobytes()
+                previous = self._conn.execute(
+                    "SELECT LENGTH(vector) FROM embeddings WHERE model=? AND text_hash=?", (model, h)
+                ).fetchone()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, last_used) VALUES (?,?,?,?)",
+                    (model, h, blob, now),
+                )
+                if previous:
+                    self._bytes += len(blob) - previous[0]
+                else:
+                    self._entries += 1
+                    self._bytes += len(blob)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        while (self.max_entries and self._entries > self.max_entries) or (self.max_bytes and self._bytes > self.max_bytes):
+            over_entries = self._entries - self.max_entries if self.max_entries else 0
+            over_bytes = 0
+            if self.max_bytes and self._bytes > self.max_bytes and self._entries:
+                # Estimate how many average-sized vectors free enough space
+                over_bytes = -(-(self._bytes - self.max_bytes) * self._entries // self._bytes)
+            over = max(over_entries, over_bytes, 1)
+            rows = self._conn.execute(
+                "SELECT model, text_hash, LENGTH(vector) FROM embeddings ORDER BY last_used LIMIT ?", (over,)
+            ).fetchall()
+            if not rows:
+                break
+            self._conn.executemany("DELETE FROM embeddings WHERE model=? AND text_hash=?", [(m, h) for m, h, _ in rows])
+            self._entries -= len(rows)
+            self._bytes -= sum(size for _, _, size in rows)
+            self.evictions += len(rows)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": self._entries,
+                "bytes": self._bytes,
+            }
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an embeddings backend so each distinct (model, normalized text) is embedded once.
+    The same instance serves index builds (embed_documents) and searches (embed_query).
+    """
+
+    def __init__(self, underlying, cache, model=None):
+        self.underlying = underlying
+        self.cache = cache
+        self.model = model or model_name(underlying)
+
+    def embed_documents(self, texts):
+        normalized = [normalize_text(t) for t in texts]
+        hashes = [text_hash(t) for t in normalized]
+        vectors = self.cache.get_many(self.model, hashes)
+
+        missing = {}
+        for h, text in zip(hashes, normalized):
+            if h not in vectors and h not in missing:
+                missing[h] = text
+        if missing:
+            new_vectors = self.underlying.embed_documents(list(missing.values()))
+            fresh = list(zip(missing.keys(), new_vectors))
+            self.cache.put_many(self.model, fresh)
+            vectors.update(fresh)
+        return [vectors[h] for h in hashes]
+
+    def embed_query(self, text):
+        normalized = normalize_text(text)
+        h = text_hash(normalized)
+        cached = self.cache.get_many(self.model, [h])
+        if h in cached:
+            return cached[h]
+        vector = self.underlying.embed_query(normalized)
+        self.cache.put_many(self.model, [(h, vector)])
+        return vector
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_embedding_cache():
+    """Process-wide cache instance, or None when EMBEDDING_CACHE_PATH is empty."""
+    global _shared_cache
+    if not CACHE_PATH:
+        return None
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = EmbeddingCache()
+            logger.info(f"Embedding cache at {CACHE_PATH} ({_shared_cache.stats()['entries']} entries).")
+        return _shared_cache
+
+
+def model_name(embeddings):
+    """Identifies the embedding model; part of cache keys and of the index manifest."""
+    return getattr(embeddings, "model", None) or getattr(embeddings, "model_name", None) or type(embeddings).__name__
+
+
+def requires_api_key(provider=EMBEDDING_PROVIDER):
+    return provider == "openai"
+
+
+def create_embeddings(provider=EMBEDDING_PROVIDER):
+    """Builds the configured embeddings backend, wrapped with the shared cache."""
+    if provider == "openai":
+        from langchain_openai import OpenAIEmbeddings
+        embeddings = OpenAIEmbeddings(model=OPENAI_EMBEDDING_MODEL, check_embedding_ctx_length=OPENAI_EMBEDDING_CHECK_CTX_LENGTH)
+    elif provider in ("hashing", "local"):
+        embeddings = HashingEmbeddings()
+    elif provider == "huggingface":
+        # Optional: needs sentence-transformers installed; runs on CPU without network once downloaded
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        embeddings = HuggingFaceEmbeddings(model_name=LOCAL_EMBEDDING_MODEL)
+    else:
+        raise ValueError(f"Unknown EMBEDDING_PROVIDER '{provider}'. Use 'openai', 'hashing' or 'huggingface'.")
+    logger.info(f"Using '{provider}' embeddings ({model_name(embeddings)}).")
+    return with_cache(embeddings)
+
+
+def with_cache(embeddings):
+    """Returns embeddings wrapped with the shared cache (unchanged if caching is disabled)."""
+    cache = get_embedding_cache()
+    if cache is None:
+        return embeddings
+    return CachedEmbeddings(embeddings, cache)
@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import shutil
+from src.ingest import SOURCE_EXTENSIONS
+from src.logger import setup_logging
+from src.vector_index import load_vector_store
+
+logger = setup_logging()
+
+# Where the persisted FAISS index and its manifest live (relative to the working dir, like "data/")
+INDEX_DIR = os.environ.get("KB_INDEX_DIR", ".kb_index")
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 2
+
+
+def file_sha256(path):
+    """Returns the hex SHA-256 of a file's contents, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def list_source_files(data_dir):
+    """Lists the policy files the knowledge base indexes, in data_dir and its subdirectories, relative and sorted."""
+    files = []
+    for root, dirs, names in os.walk(data_dir):
+        # Hidden directories (.git, editor state) are not policy content
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for name in names:
+            if not name.startswith(".") and os.path.splitext(name)[1].lower() in SOURCE_EXTENSIONS:
+                files.append(os.path.relpath(os.path.join(root, name), data_dir))
+    return sorted(files)
+
+
+def hash_sources(data_dir):
+    """Maps every source file (relative to data_dir) to its content hash."""
+    return {rel: file_sha256(os.path.join(data_dir, rel)) for rel in list_source_files(data_dir)}
+
+
+def build_manifest(settings, files):
+    """
+    Describes what an index was built from: the splitter/embedding settings and, per
+    source file, its content hash and the ids of the chunks it contributed.
+    files maps relative path -> {"sha256": ..., "chunk_ids": [...]}.
+    """
+    return {"version": MANIFEST_VERSION, "settings": settings, "files": files}
+
+
+def manifest_version(manifest):
+    """Short fingerprint of a manifest; changes whenever any indexed document or setting changes."""
+    return hashlib.sha256(json.dumps(manifest, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def diff_sources(indexed_files, current_hashes):
+    """Compares the indexed file set with the current one. Returns (added, changed, removed)."""
+    added = sorted(rel for rel in current_hashes if rel not in indexed_files)
+    changed = sorted(
+        rel for rel, sha in current_hashes.items()
+        if rel in indexed_files and indexed_files[rel]["sha256"] != sha
+    )
+    removed = sorted(rel for rel in indexed_files if rel not in current_hashes)
+    return added, changed, removed
+
+
+def load_manifest(index_dir=INDEX_DIR):
+    path = os.path.join(index_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable index manifest at {path}: {e}")
+        return None
+
+
+def load_index(embeddings, settings, index_dir=INDEX_DIR):
+    """
+    Loads the persisted FAISS index and its manifest if it was built with these settings.
+    Returns (None, None) when there is no usable index on disk. The caller diffs the
+    manifest's files against the corpus to find what needs re-indexing.
+    """
+    stored = load_manifest(index_dir)
+    if stored is None:
+        logger.info("No persisted index found.")
+        return None, None
+    if stored.get("version") != MANIFEST_VERSION or stored.get("settings") != settings:
+        logger.info("Persisted index is stale (index format or settings changed).")
+        return None, None
+    try:
+        vector_db = load_vector_store(index_dir, embeddings)
+        return vector_db, stored
+    except Exception as e:
+        logger.warning(f"Failed to load persisted index from {index_dir}: {e}")
+        return None, None
+
+
+def save_index(vector_db, manifest, lexical_index=None, index_dir=INDEX_DIR):
+    """
+    Writes the FAISS index, its docstore (chunk text + metadata), the BM25 index and the manifest.
+    The new index is written next to the old one and swapped in, so a crash mid-write
+    never leaves a manifest pointing at a half-written index.
+    """
+    tmp_dir = f"{index_dir}.tmp"
+    old_dir = f"{index_dir}.old"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    vector_db.save_local(tmp_dir)
+    if lexical_index is not None:
+        lexical_index.save(tmp_dir)
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(index_dir):
+        os.rename(index_dir, old_dir)
+    os.rename(tmp_dir, index_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    logger.info(f"Persisted Knowledge Base index to {index_dir}.")
@@ -0,0 +1,125 @@
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+from itertools import islice
+from langchain_community.document_loaders import PyPDFLoader, TextLoader
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+from src.logger import setup_logging
+
+logger = setup_logging()
+
+# Processes that parse and split source files; 0 uses every core, 1 parses in-process
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", "0")) or os.cpu_count() or 1
+# Files parsed ahead of the consumer; bounds the documents held in memory at once
+INGEST_PREFETCH = int(os.environ.get("INGEST_PREFETCH", "0")) or 2 * INGEST_WORKERS
+# Smaller corpora are parsed in-process: starting the pool costs more than it saves
+INGEST_POOL_MIN_FILES = int(os.environ.get("INGEST_POOL_MIN_FILES", "32"))
+INGEST_POOL_MIN_MB = float(os.environ.get("INGEST_POOL_MIN_MB", "10"))
+
+HTML_EXTENSIONS = (".html", ".htm")
+SOURCE_EXTENSIONS = (".txt", ".md", ".markdown", ".pdf") + HTML_EXTENSIONS
+
+
+class _HTMLText(HTMLParser):
+    """Collects the visible text of an HTML page, one line per block element."""
+
+    SKIP = {"script", "style", "head", "noscript", "template"}
+    BLOCKS = {"p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "section", "article", "table", "ul", "ol"}
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self._skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skipping += 1
+        elif tag in self.BLOCKS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP:
+            self._skipping = max(0, self._skipping - 1)
+        elif tag in self.BLOCKS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self.parts.append(data)
+
+
+def html_to_text(html):
+    parser = _HTMLText()
+    parser.feed(html)
+    parser.close()
+    lines = (" ".join(line.split()) for line in "".join(parser.parts).splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def load_documents(path):
+    """Parses one source file into langchain Documents."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".pdf":
+        return PyPDFLoader(path).load()
+    if extension in HTML_EXTENSIONS:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            return [Document(page_content=html_to_text(f.read()), metadata={"source": path})]
+    # Plain text and Markdown are split as text; the splitter's separators already follow paragraphs
+    return TextLoader(path).load()
+
+
+def load_chunks(data_dir, rel_path, sha256, chunk_size, chunk_overlap):
+    """Loads and splits one source file. Chunk ids are derived from path and content hash."""
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    chunks = text_splitter.split_documents(load_documents(os.path.join(data_dir, rel_path)))
+    ids = [f"{rel_path}::{sha256[:16]}::{i}" for i in range(len(chunks))]
+    return rel_path, chunks, ids
+
+
+def _pool_context():
+    """
+    Workers start from a fresh forkserver (spawn where there is none), never by forking this
+    process: its logging, warm-up and watcher threads may hold locks a forked child would inherit.
+    The server imports __main__ and this module once, so workers start without re-importing them.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(["__main__", "src.ingest"])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+def _worth_a_pool(data_dir, items):
+    if len(items) >= INGEST_POOL_MIN_FILES:
+        return True
+    size = sum(os.path.getsize(os.path.join(data_dir, rel_path)) for rel_path, _ in items)
+    return size >= INGEST_POOL_MIN_MB * 1024 * 1024
+
+
+def iter_chunks(data_dir, files, chunk_size, chunk_overlap, workers=INGEST_WORKERS):
+    """
+    Yields (rel_path, chunks, ids) for each of `files` (relative path -> sha256), in order, as soon
+    as that file is split. With more than one worker and at least INGEST_POOL_MIN_FILES files or
+    INGEST_POOL_MIN_MB of them, files are parsed in a process pool at most INGEST_PREFETCH files
+    ahead of the consumer.
+    """
+    items = list(files.items())
+    if workers <= 1 or len(items) <= 1 or not _worth_a_pool(data_dir, items):
+        for rel_path, sha256 in items:
+            yield load_chunks(data_dir, rel_path, sha256, chunk_size, chunk_overlap)
+        return
+
+    pending = iter(items)
+    with ProcessPoolExecutor(max_workers=min(workers, len(items)), mp_context=_pool_context()) as pool:
+        window = deque(
+            pool.submit(load_chunks, data_dir, rel_path, sha256, chunk_size, chunk_overlap)
+            for rel_path, sha256 in islice(pending, max(INGEST_PREFETCH, workers))
+        )
+        while window:
+            result = window.popleft().result()
+            for rel_path, sha256 in islice(pending, 1):
+                window.append(pool.submit(load_chunks, data_dir, rel_path, sha256, chunk_size, chunk_overlap))
+            yield result
@@ -0,0 +1,124 @@
+import heapq
+import json
+import math
+import os
+from src.embeddings import tokenize
+
+BM25_FILE = "bm25.json"
+
+# Words too common in questions to say anything about which policy is meant
+STOPWORDS = frozenset("""
+a an and are as at be but by can do does for from have how i if in is it me my no not of on or our
+please so that the their there this to us was what when where which who why will with would you your
+""".split())
+
+
+def lexical_terms(text):
+    return [t for t in tokenize(text) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Inverted index over the knowledge-base chunks, scored with Okapi BM25.
+    Postings are kept per chunk id so the index can follow incremental re-indexing
+    (add/remove) without a rebuild, and is persisted next to the FAISS index.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}  # term -> {chunk_id: term frequency}
+        self.doc_len = {}  # chunk_id -> number of terms
+        self.total_len = 0
+
+    def __len__(self):
+        return len(self.doc_len)
+
+    def add(self, chunk_id, text):
+        if chunk_id in self.doc_len:
+            self.remove([chunk_id])
+        terms = lexical_terms(text)
+        counts = {}
+        for term in terms:
+            counts[term] = counts.get(term, 0) + 1
+        for term, tf in counts.items():
+            self.postings.setdefault(term, {})[chunk_id] = tf
+        self.doc_len[chunk_id] = len(terms)
+        self.total_len += len(terms)
+
+    def add_many(self, items):
+        for chunk_id, text in items:
+            self.add(chunk_id, text)
+
+    def remove(self, chunk_ids):
+        removed = set()
+        for chunk_id in chunk_ids:
+            length = self.doc_len.pop(chunk_id, None)
+            if length is not None:
+                self.total_len -= length
+                removed.add(chunk_id)
+        if not removed:
+            return
+        # One pass over the vocabulary for the whole batch
+        for term in list(self.postings):
+            docs = self.postings[term]
+            for chunk_id in removed.intersection(docs):
+                del docs[chunk_id]
+            if not docs:
+                del self.postings[term]
+
+    def idf(self, term):
+        n = len(self.doc_len)
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, query, k=10):
+        """Returns up to k (chunk_id, score) pairs, best first."""
+        if not self.doc_len:
+            return []
+        avgdl = self.total_len / len(self.doc_len) or 1.0
+        scores = {}
+        for term in set(lexical_terms(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = self.idf(term)
+            for chunk_id, tf in docs.items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_len[chunk_id] / avgdl)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def coverage(self, query, chunk_id):
+        """Share of the query's IDF mass whose terms occur in the chunk (1.0 = every term matched)."""
+        terms = set(lexical_terms(query))
+        total = sum(self.idf(t) for t in terms)
+        if not total:
+            return 0.0
+        matched = sum(self.idf(t) for t in terms if chunk_id in self.postings.get(t, ()))
+        return matched / total
+
+    def save(self, directory):
+        with open(os.path.join(directory, BM25_FILE), "w") as f:
+            json.dump({"k1": self.k1, "b": self.b, "doc_len": self.doc_len, "postings": self.postings}, f)
+
+    @classmethod
+    def load(cls, directory):
+        path = os.path.join(directory, BM25_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as f:
+            data = json.load(f)
+        index = cls(k1=data["k1"], b=data["b"])
+        index.postings = data["postings"]
+        index.doc_len = data["doc_len"]
+        index.total_len = sum(index.doc_len.values())
+        return index
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """Fuses ranked lists of ids: score(id) = sum over lists of 1 / (k + rank). Returns ids, best first."""
+    scores = {}
+    for ranking in rankings:
+        for rank, item_id in enumerate(ranking, start=1):
+            scores[item_id] = scores.get(item_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda item_id: scores[item_id], reverse=True)
@@ -1,13 +1,200 @@
+import atexit
+import contextvars
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
 import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+# "json" (one object per line) or "text" (the classic human-readable format)
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json").lower()
+# Set LOG_FILE to an empty string to log to stdout only; its directory is created if missing
+LOG_FILE = os.environ.get("LOG_FILE", os.path.join("logs", "app.log"))
+LOG_MAX_MB = float(os.environ.get("LOG_MAX_MB", "50"))
+LOG_BACKUPS = int(os.environ.get("LOG_BACKUPS", "5"))
+# Records waiting for the writer thread; when full, new records are dropped rather than blocking
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+# Share of chat turns whose verbose agent output (crewai's thoughts and tool calls) is logged
+LOG_AGENT_SAMPLE_RATE = float(os.environ.get("LOG_AGENT_SAMPLE_RATE", "0.1"))
+# Level of litellm's own loggers, which log every LLM call at INFO
+LOG_LIBRARY_LEVEL = os.environ.get("LOG_LIBRARY_LEVEL", "WARNING").upper()
+LIBRARY_LOGGERS = ("LiteLLM", "LiteLLM Router", "LiteLLM Proxy")
+
+request_id_var = contextvars.ContextVar("request_id", default=None)
+session_id_var = contextvars.ContextVar("session_id", default=None)
+agent_output_var = contextvars.ContextVar("agent_output_sampled", default=None)
+
+ANSI_RE = re.compile(r"\x1b\[[0-9;]*m")
+
+_listener = None
+_queue_handler = None
+_setup_lock = threading.Lock()
+
+
+@contextmanager
+def log_context(request_id=None, session_id=None):
+    """
+    Tags every record logged inside the block (on this thread, or in work it hands off with the
+    context) with the request and session ids, and decides once whether the turn's verbose agent
+    output is sampled.
+    """
+    tokens = [
+        request_id_var.set(request_id or uuid.uuid4().hex[:16]),
+        session_id_var.set(session_id),
+        agent_output_var.set(random.random() < LOG_AGENT_SAMPLE_RATE),
+    ]
+    try:
+        yield
+    finally:
+        for var, token in zip((request_id_var, session_id_var, agent_output_var), tokens):
+            var.reset(token)
+
+
+class _ContextFilter(logging.Filter):
+    """Copies the context ids onto the record on the calling thread, before it is queued."""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        record.session_id = session_id_var.get()
+        return True
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """A QueueHandler that never blocks the caller: records are dropped when the queue is full."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        for key in ("request_id", "session_id"):
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _TextFormatter(logging.Formatter):
+    def format(self, record):
+        text = super().format(record)
+        ids = [getattr(record, key, None) for key in ("request_id", "session_id")]
+        return text if not any(ids) else f"{text} [{' '.join(str(i) for i in ids if i)}]"
+
+
+def _formatter():
+    if LOG_FORMAT == "text":
+        return _TextFormatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    return JsonFormatter()
+
 
 def setup_logging():
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.StreamHandler(sys.stdout),
-            logging.FileHandler("app.log")
-        ]
-    )
+    """
+    Routes the root logger through a bounded queue to a background writer thread (stdout and a
+    size-rotated LOG_FILE), so logging never blocks a request on I/O. Safe to call from every
+    module; only the first call configures anything.
+    """
+    global _listener, _queue_handler
+    with _setup_lock:
+        if _listener is None:
+            formatter = _formatter()
+            handlers = [logging.StreamHandler(sys.stdout)]
+            if LOG_FILE:
+                os.makedirs(os.path.dirname(LOG_FILE) or ".", exist_ok=True)
+                handlers.append(logging.handlers.RotatingFileHandler(
+                    LOG_FILE, maxBytes=int(LOG_MAX_MB * 1024 * 1024), backupCount=LOG_BACKUPS, encoding="utf-8",
+                ))
+            for handler in handlers:
+                handler.setFormatter(formatter)
+
+            _queue_handler = _DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+            _queue_handler.addFilter(_ContextFilter())
+            root = logging.getLogger()
+            root.setLevel(LOG_LEVEL)
+            root.addHandler(_queue_handler)
+            _listener = logging.handlers.QueueListener(_queue_handler.queue, *handlers, respect_handler_level=True)
+            _listener.start()
+            # Flush what is still queued when the process exits
+            atexit.register(_stop_listener, os.getpid())
     return logging.getLogger("CustomerSupport")
+
+
+def _stop_listener(pid):
+    # A forked child inherits the atexit hook but not the writer thread
+    if os.getpid() == pid and _listener is not None:
+        _listener.stop()
+
+
+def _after_fork_in_child():
+    """
+    The writer thread does not survive a fork (worker processes of the ingest pool), so records
+    queued in the child would never be written: log straight to stdout there instead.
+    """
+    global _queue_handler, _setup_lock
+    _setup_lock = threading.Lock()
+    if _queue_handler is None:
+        return
+    root = logging.getLogger()
+    root.removeHandler(_queue_handler)
+    _queue_handler = None
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(_formatter())
+    handler.addFilter(_ContextFilter())
+    root.addHandler(handler)
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def dropped_records():
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+def capture_library_output():
+    """
+    Call once crewai is imported. Sends crewai's verbose console output (agent thoughts, tool
+    calls, answers) through the logging queue instead of synchronous print() calls, keeping it
+    only for sampled chat turns, and replaces litellm's own stdout handlers with the queue.
+    """
+    for name in LIBRARY_LOGGERS:
+        library_logger = logging.getLogger(name)
+        for handler in list(library_logger.handlers):
+            library_logger.removeHandler(handler)
+        library_logger.propagate = True
+        library_logger.setLevel(LOG_LIBRARY_LEVEL)
+
+    from crewai.utilities.printer import Printer
+    if getattr(Printer.print, "_captured", False):
+        return
+    agent_logger = logging.getLogger("CustomerSupport.agents")
+
+    def print_to_log(self, content, color=None):
+        if agent_output_var.get():
+            agent_logger.info(ANSI_RE.sub("", str(content)).strip())
+
+    print_to_log._captured = True
+    Printer.print = print_to_log
@@ -0,0 +1,205 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from src.logger import setup_logging
+
+logger = setup_logging()
+
+# Tokens of conversation context given to the response agent, and to the intent/retrieval agents
+MEMORY_TOKEN_BUDGET = int(os.environ.get("MEMORY_TOKEN_BUDGET", "1200"))
+MEMORY_LOOKUP_BUDGET = int(os.environ.get("MEMORY_LOOKUP_BUDGET", "300"))
+# Messages kept verbatim; older ones are folded into the rolling summary
+MEMORY_RECENT_MESSAGES = int(os.environ.get("MEMORY_RECENT_MESSAGES", "6"))
+MEMORY_SUMMARY_LINES = int(os.environ.get("MEMORY_SUMMARY_LINES", "20"))
+MEMORY_TTL = int(os.environ.get("MEMORY_TTL", "3600"))
+MEMORY_MAX_SESSIONS = int(os.environ.get("MEMORY_MAX_SESSIONS", "10000"))
+TOKENIZER_MODEL = os.environ.get("MEMORY_TOKENIZER_MODEL", "gpt-4o")
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+NAME_RE = re.compile(r"\b(?i:i am|i'm|my name is|this is)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)+)")
+TICKET_RE = re.compile(r"\bticket\s*(?:number|no\.?|id)?\s*:?\s*#?\s*([A-Z0-9][A-Z0-9-]{3,})", re.IGNORECASE)
+INTENT_RE = re.compile(r"category:\s*\**\s*([A-Za-z][A-Za-z &]*[A-Za-z])", re.IGNORECASE)
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s")
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    """The tiktoken encoding of the chat model, or False when tiktoken or its data is unavailable."""
+    global _encoding
+    with _encoding_lock:
+        if _encoding is None:
+            try:
+                import tiktoken
+                _encoding = tiktoken.encoding_for_model(TOKENIZER_MODEL)
+            except Exception as e:
+                logger.warning(f"tiktoken unavailable ({e}); estimating tokens as characters / 4.")
+                _encoding = False
+        return _encoding
+
+
+def count_tokens(text):
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def truncate_to_tokens(text, budget):
+    if budget <= 0:
+        return ""
+    if count_tokens(text) <= budget:
+        return text
+    encoding = _get_encoding()
+    if encoding:
+        return encoding.decode(encoding.encode(text, disallowed_special=())[:budget]) + "…"
+    return text[:budget * 4] + "…"
+
+
+def _plain(content):
+    # Gradio 5+ may send content as a list of parts
+    if isinstance(content, list):
+        return "".join(item.get("text", "") for item in content if isinstance(item, dict) and item.get("type") == "text")
+    return content if isinstance(content, str) else ""
+
+
+class ConversationMemory:
+    """
+    What the assistant remembers of one conversation: the last few messages verbatim, a rolling
+    extractive summary of older ones (one short line per message, no LLM call), and facts
+    extracted along the way (customer identity, last intent, open ticket).
+    """
+
+    def __init__(self):
+        self.recent = deque()
+        self.summary = deque(maxlen=MEMORY_SUMMARY_LINES)
+        self.facts = {}
+        self.touched = time.monotonic()
+
+    def add(self, role, text):
+        text = (text or "").replace("[CLOSE_CHAT]", "").strip()
+        if not text:
+            return
+        self._extract_facts(role, text)
+        self.recent.append((role, text))
+        while len(self.recent) > MEMORY_RECENT_MESSAGES:
+            old_role, old_text = self.recent.popleft()
+            first = SENTENCE_RE.split(old_text, maxsplit=1)[0]
+            self.summary.append(f"{old_role.capitalize()}: {truncate_to_tokens(first, 40)}")
+
+    def _extract_facts(self, role, text):
+        if role == "user":
+            email = EMAIL_RE.search(text)
+            if email:
+                self.facts["email"] = email.group(0)
+            name = NAME_RE.search(text)
+            if name:
+                self.facts["name"] = name.group(1)
+        else:
+            ticket = TICKET_RE.search(text)
+            if ticket:
+                self.facts["open_ticket"] = ticket.group(1)
+
+    def note(self, profile=None, intent=None):
+        """Records what the crew established this turn: the resolved profile and the intent category."""
+        if profile:
+            self.facts["name"] = profile.get("username") or self.facts.get("name")
+            self.facts["email"] = profile.get("email") or self.facts.get("email")
+            self.facts["plan"] = profile.get("plan")
+        if intent:
+            match = INTENT_RE.search(intent)
+            if match:
+                self.facts["intent"] = match.group(1).strip()
+
+    def _facts_block(self):
+        lines = []
+        if self.facts.get("name") or self.facts.get("email"):
+            who = " ".join(filter(None, [self.facts.get("name"), self.facts.get("email") and f"({self.facts['email']})"]))
+            lines.append(f"- Customer: {who}")
+        if self.facts.get("plan"):
+            lines.append(f"- Plan: {self.facts['plan']}")
+        if self.facts.get("intent"):
+            lines.append(f"- Previous intent: {self.facts['intent']}")
+        if self.facts.get("open_ticket"):
+            lines.append(f"- Open ticket: #{self.facts['open_ticket']}")
+        return "Known facts:\n" + "\n".join(lines) + "\n\n" if lines else ""
+
+    def context(self, message, budget=MEMORY_TOKEN_BUDGET, max_recent=None, summary=True):
+        """
+        Prompt text for the crew under a token budget. The current message and the facts always
+        come first; then as many recent messages as fit (newest first), then summary lines.
+        """
+        current = f"Current User Query:\n{truncate_to_tokens(message, max(budget // 2, 1))}\n"
+        facts = self._facts_block()
+        remaining = budget - count_tokens(current) - count_tokens(facts)
+
+        recent = list(self.recent)[-max_recent:] if max_recent else list(self.recent)
+        kept = []
+        for role, text in reversed(recent):
+            line = f"{role.capitalize()}: {text}\n"
+            cost = count_tokens(line)
+            if cost > remaining:
+                break
+            kept.append(line)
+            remaining -= cost
+        kept.reverse()
+
+        summary_lines = []
+        if summary and len(kept) == len(recent):
+            for line in reversed(self.summary):
+                cost = count_tokens(line) + 1
+                if cost > remaining:
+                    break
+                summary_lines.append(line)
+                remaining -= cost
+            summary_lines.reverse()
+
+        parts = [facts]
+        if summary_lines:
+            parts.append("Summary of earlier conversation:\n" + "\n".join(summary_lines) + "\n\n")
+        parts.append("Previous Conversation History:\n" + "".join(kept) + "\n")
+        parts.append(current)
+        return "".join(parts)
+
+
+class MemoryStore:
+    """Conversation memories by session, rebuilt from the chat history when a session is new or reset."""
+
+    def __init__(self, ttl=MEMORY_TTL, max_sessions=MEMORY_MAX_SESSIONS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()
+
+    def get(self, session_id, history):
+        """The memory of this session; history is the chat so far, without the current message."""
+        user_turns = sum(1 for msg in history or [] if msg.get("role") == "user")
+        with self._lock:
+            memory = self._sessions.get(session_id) if session_id is not None else None
+            now = time.monotonic()
+            # A chat that was closed and reopened starts over with no user turns
+            if memory is not None and (now - memory.touched > self.ttl or (user_turns == 0 and memory.recent)):
+                memory = None
+            if memory is None:
+                memory = ConversationMemory()
+                for msg in history or []:
+                    if msg.get("role") in ("user", "assistant"):
+                        memory.add(msg["role"], _plain(msg.get("content")))
+                if session_id is not None:
+                    self._sessions[session_id] = memory
+            memory.touched = now
+            if session_id is not None:
+                self._sessions.move_to_end(session_id)
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            return memory
+
+    def drop(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+memory_store = MemoryStore()
@@ -0,0 +1,375 @@
+import contextvars
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.logger import dropped_records, request_id_var, setup_logging
+from src.memory import count_tokens
+
+logger = setup_logging()
+
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "9100"))  # 0 disables the metrics server
+# /traces carries session ids; set METRICS_HOST=0.0.0.0 only where the port is not publicly reachable
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+# /healthz and /readyz alone, on an address orchestrator and load-balancer probes can reach; 0 disables it
+HEALTH_PORT = int(os.environ.get("HEALTH_PORT", "9101"))
+HEALTH_HOST = os.environ.get("HEALTH_HOST", "0.0.0.0")
+METRICS_TRACE_HISTORY = int(os.environ.get("METRICS_TRACE_HISTORY", "200"))
+# USD per 1K tokens, for the cost estimate (gpt-4o list prices by default)
+LLM_PROMPT_PRICE_PER_1K = float(os.environ.get("LLM_PROMPT_PRICE_PER_1K", "0.0025"))
+LLM_COMPLETION_PRICE_PER_1K = float(os.environ.get("LLM_COMPLETION_PRICE_PER_1K", "0.01"))
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in list(zip(names, values)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._values = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            entry = self._values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[i] += 1
+            entry[-2] += value
+            entry[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, entry in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, entry):
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, [('le', bound)])} {count}")
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, [('le', '+Inf')])} {entry[-1]}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {entry[-2]}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {entry[-1]}")
+        return lines
+
+
+REQUESTS = Counter("pulse_requests_total", "Chat turns answered, by route.", ["route"])
+REQUEST_SECONDS = Histogram("pulse_request_seconds", "Wall time of a chat turn, by route.", ["route"])
+STAGE_SECONDS = Histogram("pulse_stage_seconds", "Wall time of a pipeline stage (agent).", ["stage"])
+STAGE_LLM_CALLS = Counter("pulse_stage_llm_calls_total", "LLM calls made by a pipeline stage.", ["stage"])
+STAGE_TOKENS = Counter("pulse_stage_tokens_total", "LLM tokens used by a pipeline stage.", ["stage", "kind"])
+STAGE_COST = Counter("pulse_stage_cost_usd_total", "Estimated LLM spend of a pipeline stage in USD.", ["stage"])
+STAGE_RETRIES = Counter("pulse_stage_retries_total", "Times a stage's agent retried its task after an error.", ["stage"])
+TOOL_CALLS = Counter("pulse_tool_calls_total", "Tool calls, by tool and outcome.", ["tool", "status"])
+TOOL_SECONDS = Histogram("pulse_tool_seconds", "Wall time of a tool call.", ["tool"])
+CACHE_LOOKUPS = Counter("pulse_cache_lookups_total", "Cache lookups, by cache and result (hit/miss).", ["cache", "result"])
+EMBEDDING_CHUNKS = Counter("pulse_embedding_chunks_total", "Chunks embedded for index builds, by source (api/checkpoint).", ["source"])
+EMBEDDING_RETRIES = Counter("pulse_embedding_retries_total", "Embedding batches retried after a rate limit or transient error.")
+LLM_USAGE_ESTIMATED = Counter("pulse_llm_usage_estimated_total", "LLM calls whose response carried no usage, so their tokens were estimated.")
+
+REGISTRY = [
+    REQUESTS, REQUEST_SECONDS, STAGE_SECONDS, STAGE_LLM_CALLS, STAGE_TOKENS, STAGE_COST, STAGE_RETRIES,
+    TOOL_CALLS, TOOL_SECONDS, CACHE_LOOKUPS, EMBEDDING_CHUNKS, EMBEDDING_RETRIES, LLM_USAGE_ESTIMATED,
+]
+
+
+def render_metrics():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    lines += [
+        "# HELP pulse_log_records_dropped_total Log records dropped because the logging queue was full.",
+        "# TYPE pulse_log_records_dropped_total counter",
+        f"pulse_log_records_dropped_total {dropped_records()}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+_usage_sink = contextvars.ContextVar("llm_usage_sink", default=None)
+_capture_lock = threading.Lock()
+
+
+def _capture_usage():
+    """
+    Wraps litellm.completion (which crewai's LLM.call uses) once, so a metered call can read the
+    usage the API reported. Only calls made inside LLMMeter.call, on that thread, are recorded.
+    """
+    import litellm
+    with _capture_lock:
+        if getattr(litellm.completion, "_metered", False):
+            return
+        completion = litellm.completion
+
+        def metered_completion(*args, **kwargs):
+            response = completion(*args, **kwargs)
+            sink = _usage_sink.get()
+            if sink is not None:
+                sink.append(getattr(response, "usage", None) or (response.get("usage") if isinstance(response, dict) else None))
+            return response
+
+        metered_completion._metered = True
+        litellm.completion = metered_completion
+
+
+def _usage_tokens(usage, key):
+    value = usage.get(key) if isinstance(usage, dict) else getattr(usage, key, None)
+    return value if isinstance(value, int) else None
+
+
+class LLMMeter:
+    """
+    Counts the calls and tokens of one agent's LLM. crewai tracks usage through process-global
+    litellm callbacks, which misattribute calls when agents run concurrently; an agent's own LLM
+    object is only ever used by that agent, so counting at its call() is exact per agent.
+    Tokens are the usage the API reported; only a response without usage is estimated with
+    tiktoken (see src.memory.count_tokens) and counted in pulse_llm_usage_estimated_total.
+    """
+
+    def __init__(self, llm):
+        _capture_usage()
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._call = llm.call
+        llm.call = self.call
+
+    def call(self, messages, callbacks=[]):
+        sink = []
+        token = _usage_sink.set(sink)
+        try:
+            response = self._call(messages, callbacks)
+        finally:
+            _usage_sink.reset(token)
+        usage = sink[-1] if sink else None
+        prompt = _usage_tokens(usage, "prompt_tokens")
+        completion = _usage_tokens(usage, "completion_tokens")
+        if prompt is None or completion is None:
+            LLM_USAGE_ESTIMATED.inc()
+            prompt = sum(count_tokens(str(m.get("content", ""))) + 4 for m in messages)
+            completion = count_tokens(response or "")
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt
+            self.completion_tokens += completion
+        return response
+
+    def snapshot(self):
+        with self._lock:
+            return (self.calls, self.prompt_tokens, self.completion_tokens)
+
+
+def record_cache(cache, hit):
+    CACHE_LOOKUPS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def stage_name(role):
+    """Metric label for an agent role, e.g. 'Tone & Empathy Specialist' -> 'tone_empathy_specialist'."""
+    return re.sub(r"[^a-z0-9]+", "_", (role or "unknown").lower()).strip("_")
+
+
+def llm_cost(prompt_tokens, completion_tokens):
+    return prompt_tokens / 1000 * LLM_PROMPT_PRICE_PER_1K + completion_tokens / 1000 * LLM_COMPLETION_PRICE_PER_1K
+
+
+_traces = deque(maxlen=METRICS_TRACE_HISTORY)
+_traces_lock = threading.Lock()
+
+
+class RequestTrace:
+    """
+    Timeline of one chat turn: a span per pipeline stage and per tool call with its wall time,
+    LLM calls, tokens, cost and retries. Finishing the trace feeds the metrics above, logs it as
+    one JSON line and keeps it for /traces.
+    """
+
+    def __init__(self, session_id=None):
+        # Shares the id of the log context, so a trace and its log lines can be joined
+        self.request_id = request_id_var.get() or uuid.uuid4().hex[:16]
+        self.session_id = session_id
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self.spans = []
+
+    def add_stage(self, role, seconds, llm_calls=0, prompt_tokens=0, completion_tokens=0, retries=0):
+        stage = stage_name(role)
+        cost = llm_cost(prompt_tokens, completion_tokens)
+        if seconds is not None:
+            STAGE_SECONDS.observe(seconds, stage=stage)
+        STAGE_LLM_CALLS.inc(llm_calls, stage=stage)
+        STAGE_TOKENS.inc(prompt_tokens, stage=stage, kind="prompt")
+        STAGE_TOKENS.inc(completion_tokens, stage=stage, kind="completion")
+        STAGE_COST.inc(cost, stage=stage)
+        if retries:
+            STAGE_RETRIES.inc(retries, stage=stage)
+        self._add({
+            "kind": "stage", "name": stage, "seconds": seconds, "llm_calls": llm_calls,
+            "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "cost_usd": round(cost, 6), "retries": retries,
+        })
+
+    def add_tool(self, tool, seconds, status):
+        # Tool metrics are recorded by the tools themselves, so calls outside a trace count too
+        self._add({"kind": "tool", "name": tool, "seconds": seconds, "status": status})
+
+    def add_cache(self, cache, hit):
+        self._add({"kind": "cache", "name": cache, "hit": hit})
+
+    def _add(self, span):
+        span["at"] = round(time.perf_counter() - self._t0, 4)
+        with self._lock:
+            self.spans.append(span)
+
+    def finish(self, route, error=None):
+        seconds = time.perf_counter() - self._t0
+        REQUESTS.inc(route=route)
+        REQUEST_SECONDS.observe(seconds, route=route)
+        stages = [s for s in self.spans if s["kind"] == "stage"]
+        trace = {
+            "request_id": self.request_id,
+            "session_id": self.session_id,
+            "started": self.started,
+            "route": route,
+            "seconds": round(seconds, 4),
+            "llm_calls": sum(s["llm_calls"] for s in stages),
+            "prompt_tokens": sum(s["prompt_tokens"] for s in stages),
+            "completion_tokens": sum(s["completion_tokens"] for s in stages),
+            "cost_usd": round(sum(s["cost_usd"] for s in stages), 6),
+            "error": error,
+            "spans": self.spans,
+        }
+        with _traces_lock:
+            _traces.append(trace)
+        logger.info(f"Trace {json.dumps(trace)}")
+        return trace
+
+
+def recent_traces(limit=50):
+    with _traces_lock:
+        return list(_traces)[-limit:]
+
+
+_readiness_checks = {}
+
+
+def register_readiness(name, check):
+    """Adds a component to /readyz; check() returns a dict with at least a boolean "ready"."""
+    _readiness_checks[name] = check
+
+
+def readiness():
+    """(all ready, per-component state) of the registered readiness checks."""
+    components = {}
+    for name, check in list(_readiness_checks.items()):
+        try:
+            components[name] = check()
+        except Exception as e:
+            components[name] = {"ready": False, "error": str(e)}
+    return all(c.get("ready") for c in components.values()), components
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    # The public probe listener answers /healthz and /readyz only
+    probes_only = False
+
+    def do_GET(self):
+        if self.path.startswith("/metrics") and not self.probes_only:
+            self._send(200, render_metrics(), "text/plain; version=0.0.4")
+        elif self.path.startswith("/traces") and not self.probes_only:
+            self._send(200, json.dumps(recent_traces(), indent=2), "application/json")
+        elif self.path.startswith("/healthz"):
+            # Liveness: the process is up and serving; it may still be warming up
+            self._send(200, json.dumps({"status": "ok"}), "application/json")
+        elif self.path.startswith("/readyz"):
+            ready, components = readiness()
+            self._send(200 if ready else 503, json.dumps({"ready": ready, "components": components}, indent=2), "application/json")
+        else:
+            self._send(404, "Not found\n", "text/plain")
+
+    def _send(self, status, body, content_type):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _ProbeHandler(_MetricsHandler):
+    probes_only = True
+
+
+_server = None
+_probe_server = None
+
+
+def _serve(host, port, handler, name):
+    try:
+        server = ThreadingHTTPServer((host, port), handler)
+    except OSError as e:
+        logger.error(f"Could not start {name} on {host}:{port}: {e}")
+        return None
+    threading.Thread(target=server.serve_forever, name=name, daemon=True).start()
+    return server
+
+
+def start_metrics_server(port=METRICS_PORT, host=METRICS_HOST, health_port=HEALTH_PORT, health_host=HEALTH_HOST):
+    """
+    Serves /metrics (Prometheus), /traces (recent request traces) and the /healthz and /readyz
+    probes on host:port, and the probes alone on health_host:health_port, from daemon threads.
+    """
+    global _server, _probe_server
+    if _probe_server is None and health_port:
+        _probe_server = _serve(health_host, health_port, _ProbeHandler, "health-server")
+        if _probe_server is not None:
+            logger.info(f"Health probes listening on {health_host}:{health_port} (/healthz, /readyz).")
+    if _server is not None or not port:
+        return _server
+    _server = _serve(host, port, _MetricsHandler, "metrics-server")
+    if _server is not None:
+        logger.info(f"Metrics server listening on {host}:{port} (/metrics, /traces, /healthz, /readyz).")
+    return _server
@@ -0,0 +1,75 @@
+import os
+import threading
+import time
+from src.user_store import user_store
+from src.logger import setup_logging
+from src.metrics import record_cache
+
+logger = setup_logging()
+
+# How long a session keeps its resolved customer profile before it is looked up again
+PROFILE_CACHE_TTL = int(os.environ.get("PROFILE_CACHE_TTL", "900"))
+
+
+class SessionProfileCache:
+    """
+    The customer profile each chat session has resolved, so later turns of the conversation skip
+    the user lookup. Entries expire after ttl seconds and are dropped as soon as the customer's
+    data changes (see UserStore.update_user) or the session ends.
+    """
+
+    def __init__(self, ttl=PROFILE_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}  # session_id -> (profile, expires_at)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, session_id):
+        if session_id is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry and entry[1] <= time.monotonic():
+                del self._entries[session_id]
+                entry = None
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        record_cache("profile", entry is not None)
+        return dict(entry[0]) if entry else None
+
+    def identified(self, session_id):
+        """Whether the session holds an unexpired profile; unlike get, not counted as a cache lookup."""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            return entry is not None and entry[1] > time.monotonic()
+
+    def put(self, session_id, profile):
+        if session_id is None or not profile:
+            return
+        with self._lock:
+            self._entries[session_id] = (dict(profile), time.monotonic() + self.ttl)
+        logger.info(f"Session identified as '{profile.get('username')}'; profile cached for {self.ttl}s.")
+
+    def invalidate_session(self, session_id):
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def invalidate_user(self, username):
+        """Drops the profile of this customer from every session holding it."""
+        with self._lock:
+            stale = [sid for sid, (profile, _) in self._entries.items() if profile.get("username") == username]
+            for sid in stale:
+                del self._entries[sid]
+        if stale:
+            logger.info(f"Invalidated cached profile of '{username}' in {len(stale)} session(s).")
+
+    def stats(self):
+        with self._lock:
+            return {"sessions": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+profile_cache = SessionProfileCache()
+user_store.add_listener(profile_cache.invalidate_user)
@@ -0,0 +1,206 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from src.embeddings import create_embeddings
+from src.logger import setup_logging
+from src.memory import memory_store
+from src.metrics import record_cache
+from src.profile_cache import profile_cache
+from src.tools import PolicyKnowledgeBase
+
+logger = setup_logging()
+
+RESPONSE_CACHE_ENABLED = os.environ.get("RESPONSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+RESPONSE_CACHE_THRESHOLD = float(os.environ.get("RESPONSE_CACHE_THRESHOLD", "0.95"))
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+# Anything that makes the answer depend on who is asking: self-identification, their
+# account/bill/plan, or numbers that look like phone or account ids
+PERSONAL_RE = re.compile(
+    r"\b(i am|i'm|im|my|mine|myself|name is|account|my bill|dues|owe|ticket)\b|\d{3,}",
+    re.IGNORECASE,
+)
+# A reply that is just a name, e.g. "John Doe" when asked who is writing
+BARE_NAME_RE = re.compile(r"^\s*[A-Z][a-z'-]+(?:\s+[A-Z][a-z'-]+){1,2}\s*[.!]?\s*$")
+# Words that only make sense against earlier messages ("what about the second one?", "does it include roaming?")
+FOLLOW_UP_RE = re.compile(
+    r"^\s*(and|also|so|then|ok|okay)\b|\b(it|its|that|this|these|those|they|them|their|one|ones|same|above|"
+    r"previous|earlier|else|instead|what about|how about)\b",
+    re.IGNORECASE,
+)
+PUNCT_RE = re.compile(r"[^\w\s$%.-]")
+
+
+def normalize_query(text):
+    return " ".join(PUNCT_RE.sub(" ", text.lower()).split())
+
+
+def _personal(text):
+    return bool(EMAIL_RE.search(text) or PERSONAL_RE.search(text) or BARE_NAME_RE.match(text))
+
+
+def is_cacheable(message, history, session_id=None):
+    """
+    Only generic, self-contained questions from sessions that have not identified a customer are
+    cached, so an answer built from one customer's profile (or from an earlier turn of another
+    conversation) is never served to another session.
+    """
+    if _personal(message):
+        return False
+    earlier = [msg.get("content") for msg in history or [] if msg.get("role") == "user"]
+    if any(isinstance(content, str) and _personal(content) for content in earlier):
+        return False
+    # The cache key is the message alone, so a follow-up would be answered out of context
+    if earlier and FOLLOW_UP_RE.search(message):
+        return False
+    if session_id is not None:
+        if profile_cache.identified(session_id):
+            return False
+        facts = memory_store.get(session_id, history).facts
+        if facts.get("name") or facts.get("email"):
+            return False
+    return True
+
+
+class ResponseCache:
+    """
+    Semantic cache of final crew answers. A lookup hits when a cached question's embedding is
+    within `threshold` cosine similarity of the new one, the entry is younger than `ttl`, and
+    it was answered from the current policy corpus. Least recently used entries are evicted
+    beyond max_entries; a corpus change drops everything.
+    """
+
+    def __init__(self, embeddings, threshold=RESPONSE_CACHE_THRESHOLD, ttl=RESPONSE_CACHE_TTL, max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # normalized query -> (unit vector, response, created_at)
+        self._corpus_version = None
+        self._matrix = None
+        self._keys = []
+        self._lock = threading.Lock()
+
+    def _embed(self, normalized):
+        vector = np.asarray(self.embeddings.embed_query(normalized), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _check_corpus(self, corpus_version):
+        if corpus_version != self._corpus_version:
+            if self._entries:
+                logger.info("Policy corpus changed; clearing response cache.")
+            self._entries.clear()
+            self._matrix = None
+            self._corpus_version = corpus_version
+
+    def _expire(self, now):
+        expired = [k for k, (_, _, created) in self._entries.items() if now - created > self.ttl]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._matrix = None
+
+    def lookup(self, message, corpus_version):
+        """Returns a cached response for a semantically equivalent question, or None."""
+        normalized = normalize_query(message)
+        with self._lock:
+            self._check_corpus(corpus_version)
+            self._expire(time.time())
+            if normalized in self._entries:
+                self._entries.move_to_end(normalized)
+                self.hits += 1
+                return self._entries[normalized][1]
+            if not self._entries:
+                self.misses += 1
+                return None
+
+        vector = self._embed(normalized)
+        with self._lock:
+            if self._corpus_version != corpus_version or not self._entries:
+                self.misses += 1
+                return None
+            if self._matrix is None:
+                self._keys = list(self._entries)
+                self._matrix = np.stack([self._entries[k][0] for k in self._keys])
+            scores = self._matrix @ vector
+            best = int(np.argmax(scores))
+            key = self._keys[best]
+            if scores[best] >= self.threshold and key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                logger.info(f"Response cache hit (similarity {scores[best]:.3f}).")
+                return self._entries[key][1]
+            self.misses += 1
+            return None
+
+    def store(self, message, response, corpus_version):
+        normalized = normalize_query(message)
+        vector = self._embed(normalized)
+        with self._lock:
+            self._check_corpus(corpus_version)
+            self._entries[normalized] = (vector, response, time.time())
+            self._entries.move_to_end(normalized)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Process-wide response cache, or None when RESPONSE_CACHE_ENABLED is off."""
+    global _response_cache
+    if not RESPONSE_CACHE_ENABLED:
+        return None
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache(create_embeddings())
+        return _response_cache
+
+
+def cached_response(message, history, session_id=None):
+    """Returns a cached answer for a generic question, or None."""
+    cache = get_response_cache()
+    corpus_version = PolicyKnowledgeBase.corpus_version
+    if cache is None or corpus_version is None or not is_cacheable(message, history, session_id):
+        return None
+    try:
+        response = cache.lookup(message, corpus_version)
+    except Exception as e:
+        logger.warning(f"Response cache lookup failed: {e}")
+        return None
+    record_cache("response", response is not None)
+    return response
+
+
+def remember_response(message, history, response, session_id=None):
+    cache = get_response_cache()
+    corpus_version = PolicyKnowledgeBase.corpus_version
+    if cache is None or corpus_version is None or not is_cacheable(message, history, session_id):
+        return
+    # Closing turns end the session in the UI; never replay them
+    if "[CLOSE_CHAT]" in response:
+        return
+    try:
+        cache.store(message, response, corpus_version)
+    except Exception as e:
+        logger.warning(f"Response cache store failed: {e}")
@@ -0,0 +1,101 @@
+import re
+import threading
+from src.logger import setup_logging
+
+logger = setup_logging()
+
+# Routes, cheapest first. "full" is the five-agent crew, whose intent agent is the LLM
+# fallback for anything the rules below cannot classify confidently.
+ROUTE_CLOSING = "closing"
+ROUTE_OUT_OF_SCOPE = "out_of_scope"
+ROUTE_GREETING = "greeting"
+ROUTE_FULL = "full"
+
+CLOSING_RESPONSE = "Thank you for contacting Pulse Telecom. Have a great day! [CLOSE_CHAT]"
+OUT_OF_SCOPE_RESPONSE = (
+    "I'm sorry, but I can only help with Pulse Telecom services such as your plan, billing, "
+    "refunds and technical support. Is there anything I can help you with regarding your account or our services?"
+)
+# Routes answered without any LLM call
+TEMPLATED_RESPONSES = {
+    ROUTE_CLOSING: CLOSING_RESPONSE,
+    ROUTE_OUT_OF_SCOPE: OUT_OF_SCOPE_RESPONSE,
+}
+
+GREETING_RE = re.compile(
+    r"^((hi|hello|hey|hiya|howdy|greetings|good (morning|afternoon|evening)|yo)( there)?( pulse ?ai)?"
+    r"|ok(ay)?|cool|great|(ok(ay)?[\s,]*)?(thanks?|thank you|thx|ty)( so much| a lot)?)[\s!.,]*$",
+    re.IGNORECASE,
+)
+# Only explicit endings close the chat; a bare "thanks" is small talk
+CLOSING_RE = re.compile(
+    r"\b(bye|goodbye|good bye|see you|that'?s all|that is all|nothing else|no more questions|"
+    r"no,? that'?s it|i'?m done|end (the )?chat)\b",
+    re.IGNORECASE,
+)
+# Topics a telecom support bot never handles, unless the message also mentions the service
+OFF_TOPIC_RE = re.compile(
+    r"\b(weather|recipe|cook(ing)?|joke|poem|song|lyrics|movie|film|sports?|football|cricket|stock|"
+    r"crypto|bitcoin|horoscope|homework|essay|translate|write (me )?(a )?code|python|javascript|capital of|president)\b",
+    re.IGNORECASE,
+)
+DOMAIN_RE = re.compile(
+    r"\b(pulse|plan|bill(ing)?|invoice|pay(ment)?|refund|cancel|account|internet|broadband|fib(er|re)|wifi|"
+    r"router|modem|mobile|5g|4g|sim|data|roaming|signal|network|outage|speed|connection|contract|subscription|"
+    r"upgrade|charge|fee|due|ticket|support|sla)s?\b",
+    re.IGNORECASE,
+)
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+
+
+def classify_route(message):
+    """
+    Cheap rule-based routing of the current user message. Anything not matched with
+    confidence (including every message that carries an identity) goes to the full crew.
+    """
+    text = (message or "").strip()
+    if not text or EMAIL_RE.search(text):
+        return ROUTE_FULL
+    if len(text) <= 60 and "?" not in text and CLOSING_RE.search(text) and not DOMAIN_RE.search(text):
+        return ROUTE_CLOSING
+    if len(text) <= 40 and GREETING_RE.match(text):
+        return ROUTE_GREETING
+    if OFF_TOPIC_RE.search(text) and not DOMAIN_RE.search(text):
+        return ROUTE_OUT_OF_SCOPE
+    return ROUTE_FULL
+
+
+class RouteStats:
+    """Per-route request counts, latency and LLM calls, so the savings of each shortcut are visible."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, route, seconds, llm_calls):
+        with self._lock:
+            entry = self._stats.setdefault(route, {"requests": 0, "total_seconds": 0.0, "llm_calls": 0})
+            entry["requests"] += 1
+            entry["total_seconds"] += seconds
+            entry["llm_calls"] += llm_calls
+            avg_seconds = entry["total_seconds"] / entry["requests"]
+            avg_calls = entry["llm_calls"] / entry["requests"]
+        logger.info(
+            f"Route '{route}' answered in {seconds:.2f}s with {llm_calls} LLM calls "
+            f"(avg {avg_seconds:.2f}s, {avg_calls:.1f} calls over {entry['requests']} requests)."
+        )
+
+    def report(self):
+        with self._lock:
+            return {
+                route: {
+                    "requests": entry["requests"],
+                    "avg_seconds": entry["total_seconds"] / entry["requests"],
+                    "avg_llm_calls": entry["llm_calls"] / entry["requests"],
+                    "llm_calls": entry["llm_calls"],
+                }
+                for route, entry in self._stats.items()
+            }
+
+
+route_stats = RouteStats()
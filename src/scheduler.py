@@ -0,0 +1,112 @@
+import asyncio
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from src.logger import setup_logging
+
+logger = setup_logging()
+
+# Crew runs in flight at once, and how many more may wait before new chats are turned away
+CHAT_MAX_CONCURRENCY = int(os.environ.get("CHAT_MAX_CONCURRENCY", "16"))
+CHAT_MAX_QUEUE = int(os.environ.get("CHAT_MAX_QUEUE", "64"))
+
+BUSY_MESSAGE = "We're experiencing very high demand right now. Please try again in a moment."
+
+
+class SchedulerBusy(Exception):
+    """Raised when the request queue is full; the caller should answer with BUSY_MESSAGE."""
+
+
+class RequestScheduler:
+    """
+    Admission control for chat turns on the asyncio event loop. At most max_concurrency
+    blocking crew runs execute in a bounded thread pool; up to max_queue more wait their turn,
+    and anything beyond that is rejected immediately instead of piling up. Turns of the same
+    session run one at a time and in order.
+    """
+
+    def __init__(self, max_concurrency=CHAT_MAX_CONCURRENCY, max_queue=CHAT_MAX_QUEUE):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="crew")
+        self._semaphore = None
+        self._session_locks = {}  # session_id -> [asyncio.Lock, users]
+        self.admitted = 0
+        self.running = 0
+        self.rejected = 0
+
+    def _get_semaphore(self):
+        # Created lazily so it binds to the server's running loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def submit(self, session_id, fn, *args):
+        """Runs fn(*args) in the worker pool once capacity and the session allow it."""
+        if self.admitted >= self.max_concurrency + self.max_queue:
+            self.rejected += 1
+            logger.warning(f"Rejecting chat turn: {self.admitted} requests in flight or queued.")
+            raise SchedulerBusy()
+
+        self.admitted += 1
+        entry = self._session_locks.setdefault(session_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                async with self._get_semaphore():
+                    self.running += 1
+                    try:
+                        loop = asyncio.get_running_loop()
+                        # Carry the caller's context (log ids) into the worker thread
+                        return await loop.run_in_executor(self._executor, contextvars.copy_context().run, fn, *args)
+                    finally:
+                        self.running -= 1
+        finally:
+            self.admitted -= 1
+            entry[1] -= 1
+            if entry[1] == 0:
+                self._session_locks.pop(session_id, None)
+
+    async def stream(self, session_id, fn, *args):
+        """
+        Like submit, for producers that report progress: fn(emit, *args) runs in the worker pool
+        and every emit(kind, text) it makes is yielded here as (kind, text) as soon as it happens.
+        """
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+        done = object()
+
+        def emit(kind, text):
+            loop.call_soon_threadsafe(events.put_nowait, (kind, text))
+
+        def produce():
+            try:
+                return fn(emit, *args)
+            finally:
+                loop.call_soon_threadsafe(events.put_nowait, done)
+
+        job = asyncio.ensure_future(self.submit(session_id, produce))
+        while True:
+            waiter = asyncio.ensure_future(events.get())
+            await asyncio.wait({waiter, job}, return_when=asyncio.FIRST_COMPLETED)
+            if not waiter.done():
+                # Rejected or failed before the producer ever ran
+                waiter.cancel()
+                await job
+                return
+            event = waiter.result()
+            if event is done:
+                break
+            yield event
+        await job
+
+    def stats(self):
+        return {
+            "running": self.running,
+            "queued": self.admitted - self.running,
+            "rejected": self.rejected,
+            "sessions": len(self._session_locks),
+        }
+
+
+scheduler = RequestScheduler()
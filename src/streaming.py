@@ -0,0 +1,76 @@
+import threading
+from langchain_core.messages import HumanMessage, SystemMessage
+from src.agents import CustomerSupportAgents, get_llm
+from src.tasks import CustomerSupportTasks
+from src.crew_pool import DRAFT, ISSUES, LOOKUP_QUERY, QUERY
+from src.memory import count_tokens
+from src.metrics import LLM_USAGE_ESTIMATED
+
+# Shown in the chat while a stage runs, keyed by the role of the agent that just finished
+STAGE_PROGRESS = {
+    None: "Understanding your question…",
+    "Intent Classification Specialist": "Checking your account and our policies…",
+    "Information Retrieval Specialist": "Drafting your answer…",
+    "Account Lookup Specialist": "Drafting your answer…",
+    "Policy Research Specialist": "Drafting your answer…",
+    "Customer Support Representative": "Reviewing the answer…",
+    "Compliance & Quality Officer": "Polishing the reply…",
+}
+
+_stages = None
+_stages_lock = threading.Lock()
+
+
+def get_stage(name):
+    """(agent, task) definitions of the stages that can run as a single streamed LLM call."""
+    global _stages
+    with _stages_lock:
+        if _stages is None:
+            agents = CustomerSupportAgents()
+            tasks = CustomerSupportTasks()
+            tone_agent = agents.tone_optimization_agent()
+            gen_agent = agents.response_generation_agent()
+            editor = agents.compliance_tone_agent()
+            _stages = {
+                "tone": (tone_agent, tasks.tone_optimization_task(tone_agent)),
+                "greeting": (gen_agent, tasks.greeting_task(gen_agent, QUERY)),
+                "rewrite": (editor, tasks.compliance_rewrite_task(editor, LOOKUP_QUERY, DRAFT, ISSUES)),
+            }
+        return _stages[name]
+
+
+def _fill(template, inputs):
+    for key, value in inputs.items():
+        template = template.replace("{" + key + "}", str(value))
+    return template
+
+
+def stage_messages(agent, task, context, inputs):
+    """The prompt crewai would give this agent for this task, without the tool-use scaffolding."""
+    system = f"You are {agent.role}. {agent.backstory}\nYour personal goal is: {agent.goal}"
+    prompt = f"{_fill(task.description, inputs)}\n\nThis is the expected criteria for your final answer: {task.expected_output}\n"
+    if context:
+        prompt += f"\nThis is the context you're working with:\n{context}\n"
+    prompt += "\nRespond with the final answer only, exactly as it should be sent to the customer."
+    return [SystemMessage(content=system), HumanMessage(content=prompt)]
+
+
+def stream_stage(name, context, inputs, usage=None):
+    """
+    Runs one stage as a streaming LLM call, yielding text chunks as they arrive. If a usage dict
+    is given, it receives the call's token counts (input_tokens, output_tokens) as the API reports
+    them, or estimated like LLMMeter does when the API reports none.
+    """
+    agent, task = get_stage(name)
+    messages = stage_messages(agent, task, context, inputs)
+    completion = []
+    for chunk in get_llm().stream(messages, stream_usage=True):
+        if usage is not None and chunk.usage_metadata:
+            usage.update(chunk.usage_metadata)
+        if chunk.content:
+            completion.append(chunk.content)
+            yield chunk.content
+    if usage is not None and "input_tokens" not in usage:
+        LLM_USAGE_ESTIMATED.inc()
+        usage["input_tokens"] = sum(count_tokens(str(m.content)) + 4 for m in messages)
+        usage["output_tokens"] = count_tokens("".join(completion))
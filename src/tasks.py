@@ -15,6 +15,22 @@ class CustomerSupportTasks:
             agent=agent
         )
 
+    def user_lookup_task(self, agent, customer_query):
+        return Task(
+            description=f'If the following conversation contains the customer\'s Name or Email, use "User Details Tool" to fetch their profile. If it contains neither, answer "No user identified" without using any tool.\n\nQuery: "{customer_query}"',
+            expected_output='The User Profile exactly as returned by the tool, "User not found", or "No user identified".',
+            agent=agent,
+            async_execution=True
+        )
+
+    def policy_retrieval_task(self, agent, customer_query):
+        return Task(
+            description=f'Use "Policy Search Tool" to find relevant info for the query: "{customer_query}".\nFind policies, plan details, or troubleshooting steps.',
+            expected_output='A summary of relevant policy/product documents. Return "None" if nothing relevant is found.',
+            agent=agent,
+            async_execution=True
+        )
+
     def response_generation_task(self, agent, customer_query):
         return Task(
             description=f'''Draft a response to: "{customer_query}".
@@ -42,3 +58,29 @@ class CustomerSupportTasks:
             expected_output='The final, polished response ready to be sent to the customer.',
             agent=agent
         )
+
+    def greeting_task(self, agent, customer_query):
+        return Task(
+            description=f'''The customer is greeting you or making small talk. Reply briefly and warmly: "{customer_query}".
+            1. Identity: If the conversation shows no Name and Email yet, ask: "Are you an existing customer? If so, please share your Name and Email so I can access your account."
+            2. If the customer already identified themselves, greet them by name and ask how you can help.
+            3. Do NOT mention any account details.
+            ''',
+            expected_output='A short, friendly reply to the customer.',
+            agent=agent
+        )
+
+    def compliance_rewrite_task(self, agent, customer_query, draft, issues):
+        return Task(
+            description=f'''Rewrite the drafted response below so it passes review. Automated checks found:
+{issues}
+
+Customer query: "{customer_query}"
+
+Draft:
+"""{draft}"""
+
+Fix every issue, keep all other facts unchanged, and make the tone polite, professional and empathetic.''',
+            expected_output='The final, compliant response ready to be sent to the customer, with no commentary.',
+            agent=agent
+        )
@@ -1,33 +1,174 @@
 import logging
 import os
-from langchain_community.document_loaders import TextLoader, DirectoryLoader, PyPDFLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import FAISS
+import threading
+import time
+import numpy as np
 from langchain.tools import tool
+from src.embedding_pipeline import EMBED_BATCH_SIZE, EMBED_CONCURRENCY, embed_documents
+from src.embeddings import EMBEDDING_PROVIDER, create_embeddings, model_name, requires_api_key
+from src.index_store import INDEX_DIR, build_manifest, diff_sources, hash_sources, load_index, manifest_version, save_index
+from src.ingest import iter_chunks
+from src.lexical import BM25Index, reciprocal_rank_fusion
 from src.logger import setup_logging
+from src.metrics import TOOL_CALLS, TOOL_SECONDS, register_readiness
+from src.user_store import candidate_identifiers, user_store
+from src.vector_index import VectorStoreBuilder, index_settings, rebuild_without, supports_remove, writable
 
 logger = setup_logging()
 
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 100
+# Seconds between checks of data/ for edited policy files; 0 disables the watcher
+WATCH_INTERVAL = float(os.environ.get("KB_WATCH_INTERVAL", "0"))
+# "hybrid" (BM25 + vector, fused with reciprocal rank fusion), "vector" or "lexical"
+RETRIEVAL_MODE = os.environ.get("RETRIEVAL_MODE", "hybrid").lower()
+RETRIEVAL_CANDIDATES = int(os.environ.get("RETRIEVAL_CANDIDATES", "10"))
+# The embedding call is skipped when the best BM25 hit covers this share of the query's terms
+# (IDF-weighted) and beats the runner-up by LEXICAL_MARGIN
+LEXICAL_MIN_COVERAGE = float(os.environ.get("LEXICAL_MIN_COVERAGE", "0.9"))
+LEXICAL_MARGIN = float(os.environ.get("LEXICAL_MARGIN", "1.5"))
+# Chunks are sent for embedding in groups of this size while later files are still being parsed
+INGEST_EMBED_CHUNKS = int(os.environ.get("INGEST_EMBED_CHUNKS", str(EMBED_BATCH_SIZE * EMBED_CONCURRENCY)))
+
 class PolicyKnowledgeBase:
     vector_db = None
+    lexical_index = None
+    embeddings = None
+    manifest = None
+    # Fingerprint of the indexed corpus; caches of answers derived from it key on this
+    corpus_version = None
+    data_source_path = "data/"
+    # "cold", "warming", "ready" or "failed"; see readiness()
+    status = "cold"
+    last_error = None
+    # Guards reads/writes of the live FAISS index; _refresh_lock serializes re-indexing
+    _lock = threading.RLock()
+    _refresh_lock = threading.Lock()
+    # Single-flight: one build at a time, whoever asks for it
+    _init_lock = threading.Lock()
+    _warmup_lock = threading.Lock()
+    _warmup_thread = None
+    _watcher = None
+    _watcher_stop = threading.Event()
+
+    @staticmethod
+    def _settings(embeddings):
+        return {
+            "chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP, "embedding_model": model_name(embeddings),
+            **index_settings(),
+        }
+
+    @staticmethod
+    def _publish(vector_db, lexical_index, manifest):
+        with PolicyKnowledgeBase._lock:
+            PolicyKnowledgeBase.vector_db = vector_db
+            PolicyKnowledgeBase.lexical_index = lexical_index
+            PolicyKnowledgeBase.manifest = manifest
+            PolicyKnowledgeBase.corpus_version = manifest_version(manifest)
+
+    @staticmethod
+    def _ingest(files, on_group):
+        """
+        Parses, splits and embeds `files` (relative path -> sha256) as a stream: groups of about
+        INGEST_EMBED_CHUNKS chunks are embedded as soon as they are split, while worker processes
+        parse later files, and handed to on_group(chunks, ids, vectors). Nothing here keeps a
+        group after that, so beyond what on_group stores, memory holds one group and the
+        documents being parsed. Returns (manifest files, chunk count).
+        """
+        entries, group, group_ids = {}, [], []
+        count = 0
+
+        def embed_group():
+            if group:
+                texts = [c.page_content for c in group]
+                # float32 rows take a sixth of the memory of lists of Python floats
+                vectors = np.asarray(embed_documents(PolicyKnowledgeBase.embeddings, texts), dtype=np.float32)
+                on_group(list(group), list(group_ids), vectors)
+                group.clear()
+                group_ids.clear()
+
+        for rel_path, file_chunks, file_ids in iter_chunks(PolicyKnowledgeBase.data_source_path, files, CHUNK_SIZE, CHUNK_OVERLAP):
+            entries[rel_path] = {"sha256": files[rel_path], "chunk_ids": file_ids}
+            group.extend(file_chunks)
+            group_ids.extend(file_ids)
+            count += len(file_chunks)
+            if len(group) >= INGEST_EMBED_CHUNKS:
+                embed_group()
+        embed_group()
+        return entries, count
 
     @staticmethod
     def initialize():
         """
-        Initializes the vector database with policy documents.
-        This should be called at application startup.
-        It attempts to fetch documents from a Git repository first.
-        If that fails or no repo is provided, it falls back to local data.
+        Initializes the vector database with policy documents, blocking until it is ready.
+        Concurrent callers wait for the one build in progress instead of starting their own;
+        request paths should call warm_up() instead.
+        A persisted index is reused when its settings match; only files added, changed or
+        removed since it was written are re-indexed. Otherwise the index is built from data/.
         """
-        if PolicyKnowledgeBase.vector_db is not None:
-            logger.info("Knowledge Base already initialized.")
-            return
+        with PolicyKnowledgeBase._init_lock:
+            if PolicyKnowledgeBase.vector_db is not None:
+                logger.info("Knowledge Base already initialized.")
+                return
+
+            PolicyKnowledgeBase.status = "warming"
+            started = time.perf_counter()
+            try:
+                PolicyKnowledgeBase._build()
+            except Exception as e:
+                PolicyKnowledgeBase.status, PolicyKnowledgeBase.last_error = "failed", str(e)
+                raise e
+            if PolicyKnowledgeBase.vector_db is None:
+                PolicyKnowledgeBase.status = "failed"
+                PolicyKnowledgeBase.last_error = "No index was built: no documents, or the embeddings backend is not configured."
+            else:
+                PolicyKnowledgeBase.status, PolicyKnowledgeBase.last_error = "ready", None
+                logger.info(f"Knowledge Base ready in {time.perf_counter() - started:.1f}s.")
+
+    @staticmethod
+    def warm_up():
+        """
+        Starts initialize() on a background thread unless the index is ready or already being
+        built. Never blocks; until the index is ready, searches report it as loading.
+        """
+        with PolicyKnowledgeBase._warmup_lock:
+            thread = PolicyKnowledgeBase._warmup_thread
+            if PolicyKnowledgeBase.vector_db is not None or (thread is not None and thread.is_alive()):
+                return thread
+
+            def warm():
+                try:
+                    PolicyKnowledgeBase.initialize()
+                except Exception:
+                    pass  # logged by initialize; status is "failed" and the next warm_up() retries
+
+            thread = threading.Thread(target=warm, name="kb-warmup", daemon=True)
+            PolicyKnowledgeBase._warmup_thread = thread
+            thread.start()
+            return thread
 
+    @staticmethod
+    def readiness():
+        """Whether searches can be served, for the UI and the /readyz health check."""
+        with PolicyKnowledgeBase._lock:
+            vector_db, manifest = PolicyKnowledgeBase.vector_db, PolicyKnowledgeBase.manifest
+            return {
+                "ready": vector_db is not None,
+                "status": PolicyKnowledgeBase.status,
+                "refreshing": PolicyKnowledgeBase._refresh_lock.locked(),
+                "chunks": len(vector_db.index_to_docstore_id) if vector_db is not None else 0,
+                "files": len(manifest["files"]) if manifest else 0,
+                "corpus_version": PolicyKnowledgeBase.corpus_version,
+                "error": PolicyKnowledgeBase.last_error,
+            }
+
+    @staticmethod
+    def _build():
+        """Loads or builds the index and publishes it; called by initialize() under the single-flight lock."""
         logger.info("Initializing Knowledge Base...")
         
         # Configuration for Policy Source
-        data_source_path = "data/"
+        data_source_path = PolicyKnowledgeBase.data_source_path
         
         logger.info(f"Initializing Knowledge Base from {data_source_path}")
         
@@ -39,137 +180,273 @@ class PolicyKnowledgeBase:
                 logger.info("Created sample policy document.")
 
         try:
-            docs = []
-            # Load Text files
-            txt_loader = DirectoryLoader(data_source_path, glob="*.txt", loader_cls=TextLoader)
-            docs.extend(txt_loader.load())
-            logger.info(f"Loaded {len(docs)} text documents.")
-
-            # Load PDF files
-            pdf_loader = DirectoryLoader(data_source_path, glob="*.pdf", loader_cls=PyPDFLoader)
-            pdf_docs = pdf_loader.load()
-            docs.extend(pdf_docs)
-            logger.info(f"Loaded {len(pdf_docs)} PDF documents.")
-            
-            if not docs:
+            current_files = hash_sources(data_source_path)
+            if not current_files:
                  logger.warning("No documents found to index.")
                  return
 
-            text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-            chunks = text_splitter.split_documents(docs)
-            logger.info(f"Split documents into {len(chunks)} chunks.")
-            
-            # Check for API key
-            if not os.environ.get("OPENAI_API_KEY"):
-                 logger.warning("OPENAI_API_KEY not found in environment. Embeddings will fail.")
+            # Check for API key (local embedding providers do not need one)
+            if requires_api_key() and not os.environ.get("OPENAI_API_KEY"):
+                 logger.warning(f"OPENAI_API_KEY not found in environment. '{EMBEDDING_PROVIDER}' embeddings will fail.")
                  return
 
-            embeddings = OpenAIEmbeddings()
-            PolicyKnowledgeBase.vector_db = FAISS.from_documents(chunks, embeddings)
-            logger.info(f"Knowledge Base Initialized successfully from {data_source_path}.")
+            embeddings = create_embeddings()
+            settings = PolicyKnowledgeBase._settings(embeddings)
+            PolicyKnowledgeBase.embeddings = embeddings
+
+            cached_db, manifest = load_index(embeddings, settings)
+            if cached_db is not None:
+                lexical_index = BM25Index.load(INDEX_DIR) or PolicyKnowledgeBase._build_lexical_index(cached_db)
+                PolicyKnowledgeBase._publish(cached_db, lexical_index, manifest)
+                logger.info(f"Knowledge Base loaded from persisted index ({len(manifest['files'])} files).")
+                # Picks up documents edited while the app was down; a no-op for an unchanged corpus
+                PolicyKnowledgeBase.refresh()
+            else:
+                started = time.perf_counter()
+                # Each embedded group goes straight into the indexes instead of being collected first
+                builder = VectorStoreBuilder(embeddings)
+                lexical_index = BM25Index()
+
+                def index_group(chunks, ids, vectors):
+                    builder.add(chunks, vectors, ids)
+                    lexical_index.add_many(zip(ids, (c.page_content for c in chunks)))
+
+                files, count = PolicyKnowledgeBase._ingest(current_files, index_group)
+                logger.info(
+                    f"Loaded {len(files)} documents and split and embedded them into {count} chunks "
+                    f"in {time.perf_counter() - started:.1f}s."
+                )
+
+                if not count:
+                     logger.warning("No documents found to index.")
+                     return
+
+                vector_db = builder.finish()
+                manifest = build_manifest(settings, files)
+                PolicyKnowledgeBase._publish(vector_db, lexical_index, manifest)
+                logger.info(f"Knowledge Base Initialized successfully from {data_source_path}.")
+
+                try:
+                    save_index(vector_db, manifest, lexical_index)
+                except Exception as e:
+                    # A failed write only costs a rebuild on the next start
+                    logger.warning(f"Could not persist Knowledge Base index: {e}")
+
+            if WATCH_INTERVAL > 0:
+                PolicyKnowledgeBase.start_watcher(WATCH_INTERVAL)
             
         except Exception as e:
             logger.error(f"Error initializing Knowledge Base: {e}")
             raise e
 
+    @staticmethod
+    def refresh():
+        """
+        Applies changes in data/ to the live index: chunks of removed or changed files are
+        deleted and only added or changed files are re-split and re-embedded.
+        Returns True if the index changed.
+        """
+        if PolicyKnowledgeBase.vector_db is None:
+            PolicyKnowledgeBase.initialize()
+            return PolicyKnowledgeBase.vector_db is not None
+
+        with PolicyKnowledgeBase._refresh_lock:
+            indexed_files = PolicyKnowledgeBase.manifest["files"]
+            current_files = hash_sources(PolicyKnowledgeBase.data_source_path)
+            added, changed, removed = diff_sources(indexed_files, current_files)
+            if not (added or changed or removed):
+                return False
+
+            stale_ids = [cid for rel in changed + removed for cid in indexed_files[rel]["chunk_ids"]]
+            files = {rel: entry for rel, entry in indexed_files.items() if rel not in changed + removed}
+            # Embed outside the index lock so searches keep running during the network calls
+            # Only the added and changed files are held; they go into the live index in one step below
+            new_chunks, new_ids, vectors = [], [], []
+
+            def collect(chunks, ids, group_vectors):
+                new_chunks.extend(chunks)
+                new_ids.extend(ids)
+                vectors.extend(group_vectors)
 
+            new_files, _ = PolicyKnowledgeBase._ingest({rel: current_files[rel] for rel in added + changed}, collect)
+            files.update(new_files)
+            texts = [c.page_content for c in new_chunks]
 
+            manifest = build_manifest(PolicyKnowledgeBase.manifest["settings"], files)
+            live_db = PolicyKnowledgeBase.vector_db
+            in_place = supports_remove(live_db.index) or not stale_ids
+            if in_place:
+                # A memory-mapped index is read-only; edit a copy held in RAM
+                vector_db = writable(live_db)
+            else:
+                # IVF/HNSW/PQ cannot delete in place: build (and re-train) a replacement outside the lock
+                vector_db = rebuild_without(live_db, stale_ids, PolicyKnowledgeBase.embeddings, new_chunks, vectors, new_ids)
+            with PolicyKnowledgeBase._lock:
+                lexical_index = PolicyKnowledgeBase.lexical_index
+                if stale_ids:
+                    if in_place:
+                        vector_db.delete(stale_ids)
+                    lexical_index.remove(stale_ids)
+                if new_ids:
+                    if in_place:
+                        vector_db.add_embeddings(
+                            list(zip(texts, vectors)),
+                            metadatas=[c.metadata for c in new_chunks],
+                            ids=new_ids,
+                        )
+                    lexical_index.add_many(zip(new_ids, texts))
+                PolicyKnowledgeBase._publish(vector_db, lexical_index, manifest)
+            # Writing to disk only reads the published objects; _refresh_lock keeps other writers out,
+            # so searches need not wait for it
+            save_index(vector_db, manifest, lexical_index)
+
+            logger.info(
+                f"Knowledge Base re-indexed: {len(added)} added, {len(changed)} changed, {len(removed)} removed "
+                f"({len(new_ids)} chunks embedded, {len(stale_ids)} deleted)."
+            )
+            return True
+
+    @staticmethod
+    def _build_lexical_index(vector_db):
+        """Rebuilds the BM25 index from the chunks stored in a FAISS docstore."""
+        lexical_index = BM25Index()
+        for chunk_id in vector_db.index_to_docstore_id.values():
+            lexical_index.add(chunk_id, vector_db.docstore.search(chunk_id).page_content)
+        return lexical_index
+
+    @staticmethod
+    def _lexical_confident(lexical_index, query, hits):
+        top_id, top_score = hits[0]
+        if lexical_index.coverage(query, top_id) < LEXICAL_MIN_COVERAGE:
+            return False
+        return len(hits) == 1 or top_score >= LEXICAL_MARGIN * hits[1][1]
+
+    @staticmethod
+    def search(query, k=3, mode=None):
+        """
+        Retrieves the k most relevant chunks for a query.
+        In hybrid mode, BM25 and vector candidates are fused with reciprocal rank fusion; when
+        the lexical match is confident (e.g. an exact plan name) the embedding call is skipped.
+        The query is embedded outside the index lock. Both indexes are taken from the same
+        published snapshot, so a swap to a rebuilt index mid-search cannot mix their chunk ids.
+        """
+        mode = mode or RETRIEVAL_MODE
+        with PolicyKnowledgeBase._lock:
+            vector_db, lexical_index = PolicyKnowledgeBase.vector_db, PolicyKnowledgeBase.lexical_index
+        lexical_hits = []
+        if mode in ("hybrid", "lexical") and lexical_index is not None:
+            with PolicyKnowledgeBase._lock:
+                lexical_hits = lexical_index.search(query, k=RETRIEVAL_CANDIDATES)
+                lexical_only = mode == "lexical" or (lexical_hits and PolicyKnowledgeBase._lexical_confident(lexical_index, query, lexical_hits))
+                if lexical_only:
+                    return [vector_db.docstore.search(chunk_id) for chunk_id, _ in lexical_hits[:k]]
+
+        embedding = PolicyKnowledgeBase.embeddings.embed_query(query)
+        with PolicyKnowledgeBase._lock:
+            if not lexical_hits:
+                return vector_db.similarity_search_by_vector(embedding, k=k)
+            vector_docs = vector_db.similarity_search_by_vector(embedding, k=RETRIEVAL_CANDIDATES)
+            fused_ids = reciprocal_rank_fusion([[d.id for d in vector_docs], [chunk_id for chunk_id, _ in lexical_hits]])
+            return [vector_db.docstore.search(chunk_id) for chunk_id in fused_ids[:k]]
+
+    @staticmethod
+    def start_watcher(interval=5.0):
+        """Polls data/ every `interval` seconds and applies changed documents without a restart."""
+        if PolicyKnowledgeBase._watcher is not None and PolicyKnowledgeBase._watcher.is_alive():
+            return
+
+        def watch():
+            while not PolicyKnowledgeBase._watcher_stop.wait(interval):
+                try:
+                    PolicyKnowledgeBase.refresh()
+                except Exception as e:
+                    logger.error(f"Error re-indexing Knowledge Base: {e}")
+
+        PolicyKnowledgeBase._watcher_stop.clear()
+        PolicyKnowledgeBase._watcher = threading.Thread(target=watch, name="kb-watcher", daemon=True)
+        PolicyKnowledgeBase._watcher.start()
+        logger.info(f"Watching {PolicyKnowledgeBase.data_source_path} for policy changes every {interval}s.")
+
+    @staticmethod
+    def stop_watcher():
+        PolicyKnowledgeBase._watcher_stop.set()
+        if PolicyKnowledgeBase._watcher is not None:
+            PolicyKnowledgeBase._watcher.join()
+            PolicyKnowledgeBase._watcher = None
+
+
+register_readiness("knowledge_base", PolicyKnowledgeBase.readiness)
+
+
+from typing import Callable, Optional
 from crewai.tools import BaseTool
 from pydantic import Field
 
-class PolicySearchTool(BaseTool):
+class TracedTool(BaseTool):
+    """A tool whose calls are timed into the tool metrics and reported to `tracer(name, seconds, status)` if set."""
+    tracer: Optional[Callable] = Field(default=None, exclude=True)
+
+    def _record(self, started, status):
+        seconds = time.perf_counter() - started
+        TOOL_CALLS.inc(tool=self.name, status=status)
+        TOOL_SECONDS.observe(seconds, tool=self.name)
+        if self.tracer is not None:
+            self.tracer(self.name, seconds, status)
+
+class PolicySearchTool(TracedTool):
     name: str = "Policy Search Tool"
     description: str = "Useful to search for company policies, refund rules, SLA details, and other internal documents. Always use this tool when you need to answer questions about company rules or procedures."
     
     def _run(self, query: str) -> str:
+        started = time.perf_counter()
+        status = "error"
         try:
             if PolicyKnowledgeBase.vector_db is None:
-                PolicyKnowledgeBase.initialize()
-                if PolicyKnowledgeBase.vector_db is None:
-                    return "Error: Knowledge Base not initialized. Check API key."
-            
+                # Never build the index inside a request; kick off (or join) the background warm-up
+                PolicyKnowledgeBase.warm_up()
+                status = "unavailable"
+                if PolicyKnowledgeBase.status == "failed":
+                    return f"Error: Knowledge Base not initialized ({PolicyKnowledgeBase.last_error}). Check API key or EMBEDDING_PROVIDER."
+                return "The policy Knowledge Base is still loading, so policy details are unavailable for a moment. Do not guess at policies; ask the customer to try again shortly."
+
             # Search for similar documents
-            docs = PolicyKnowledgeBase.vector_db.similarity_search(query, k=3)
+            docs = PolicyKnowledgeBase.search(query, k=3)
+            status = "ok" if docs else "empty"
             return "\n\n".join([d.page_content for d in docs])
         except Exception as e:
             logger.error(f"Error during policy search: {e}")
             return f"Error occurred during search: {str(e)}"
+        finally:
+            self._record(started, status)
 
 # Create the tool instance
 policy_search_tool = PolicySearchTool()
 
-class FetchUserDetailsTool(BaseTool):
+class FetchUserDetailsTool(TracedTool):
     name: str = "User Details Tool"
     description: str = "Useful to fetch customer details from the database. Input should be a username (e.g., 'John Doe') or email. Returns user profile including plan, billing info, and dues. If user not found, returns 'User not found'."
+    # Called with each profile this instance resolves; set by whoever owns the agent holding the tool
+    listener: Optional[Callable] = Field(default=None, exclude=True)
 
     def _run(self, identifier: str) -> str:
+        started = time.perf_counter()
+        status = "error"
         try:
-            # Clean identifier
-            identifier = identifier.strip().strip("'\"")
-            
-            # If agent passed both (e.g. "John Doe, john.doe@example.com"), try splitting
-            identifiers_to_try = [identifier]
-            if "," in identifier:
-                identifiers_to_try.extend([i.strip() for i in identifier.split(",")])
-            if " and " in identifier.lower():
-                import re
-                identifiers_to_try.extend([i.strip() for i in re.split(r" and ", identifier, flags=re.IGNORECASE)])
-            
-            # Construct absolute path to DB relative to this file
-            db_path = os.path.join(os.path.dirname(__file__), '../data/users.db')
-            
-            import sqlite3
-            
-            # Check if DB needs initialization (missing, empty, or missing table)
-            should_init = False
-            if not os.path.exists(db_path) or os.path.getsize(db_path) == 0:
-                should_init = True
-                logger.warning(f"DB file missing or empty at {db_path}. Re-initializing...")
-            else:
-                try:
-                    conn = sqlite3.connect(db_path)
-                    cursor = conn.cursor()
-                    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='users';")
-                    if not cursor.fetchone():
-                        should_init = True
-                        logger.warning("DB exists but 'users' table missing. Re-initializing...")
-                    conn.close()
-                except Exception as e:
-                    logger.error(f"Error checking DB health: {e}")
-                    should_init = True
-
-            if should_init:
-                try:
-                    from src.db_init import init_db
-                    logger.info("Triggering database initialization...")
-                    init_db()
-                    logger.info("Database re-initialized successfully.")
-                except Exception as e:
-                    logger.error(f"Failed to re-initialize database: {e}")
-                    return "Error: Database initialization failed."
-
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            
-            row = None
-            for idx in identifiers_to_try:
-                if not idx: continue
-                logger.info(f"DEBUG: Attempting retrieval for identifier: '{idx}'")
-                cursor.execute("SELECT * FROM users WHERE username=? OR email=?", (idx, idx))
-                row = cursor.fetchone()
-                if row:
-                    break
-            
-            conn.close()
-            
-            if row:
-                columns = ['username', 'email', 'address', 'phone', 'service_opted', 'plan', 'start_date', 'end_date', 'monthly_cost', 'dues', 'next_billing_date', 'billing_cycle']
-                user_data = dict(zip(columns, row))
+            identifiers_to_try = candidate_identifiers(identifier)
+            logger.info(f"Looking up user for identifiers: {identifiers_to_try}")
+            user_data = user_store.find_user(identifiers_to_try)
+            if user_data:
+                status = "ok"
+                if self.listener is not None:
+                    self.listener(user_data)
                 return str(user_data)
             else:
+                status = "not_found"
                 return "User not found."
         except Exception as e:
             logger.error(f"Error fetching user details: {e}")
             return f"Error fetching user details: {str(e)}"
+        finally:
+            self._record(started, status)
 
 fetch_user_details = FetchUserDetailsTool()
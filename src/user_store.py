@@ -0,0 +1,173 @@
+import os
+import queue
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from src.db_init import DB_PATH, USER_COLUMNS, ensure_indexes, init_db
+from src.logger import setup_logging
+
+logger = setup_logging()
+
+# Connections kept open per process; lookups beyond that wait for a free one
+USER_DB_POOL_SIZE = int(os.environ.get("USER_DB_POOL_SIZE", "8"))
+USER_DB_PATH = os.environ.get("USER_DB_PATH", DB_PATH)
+
+_SELECT = f"SELECT {', '.join(USER_COLUMNS)} FROM users"
+
+
+def candidate_identifiers(identifier):
+    """
+    Every identifier worth trying for what the agent passed in, most specific first. The agent
+    sometimes passes both ("John Doe, john.doe@example.com" or "John Doe and john.doe@...").
+    """
+    identifier = identifier.strip().strip("'\"")
+    candidates = [identifier]
+    if "," in identifier:
+        candidates.extend(i.strip() for i in identifier.split(","))
+    if " and " in identifier.lower():
+        candidates.extend(i.strip() for i in re.split(r" and ", identifier, flags=re.IGNORECASE))
+    return list(dict.fromkeys(c for c in candidates if c))
+
+
+class ConnectionPool:
+    """
+    A fixed number of SQLite connections shared by all threads. Each connection is used by one
+    thread at a time; WAL mode lets readers run concurrently with a writer.
+    """
+
+    def __init__(self, path, size=USER_DB_POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10, cached_statements=256)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=10000")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self.size
+                if can_create:
+                    self._created += 1
+            if can_create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                conn = self._idle.get()
+        try:
+            yield conn
+        except sqlite3.DatabaseError:
+            # Don't hand a connection in an unknown state to the next caller
+            conn.close()
+            with self._lock:
+                self._created -= 1
+            raise
+        else:
+            self._idle.put(conn)
+
+    def close_all(self):
+        with self._lock:
+            while True:
+                try:
+                    self._idle.get_nowait().close()
+                except queue.Empty:
+                    break
+                self._created -= 1
+
+
+class UserStore:
+    """Customer profile lookups over a pooled, indexed connection to the users database."""
+
+    def __init__(self, path=USER_DB_PATH, pool_size=USER_DB_POOL_SIZE):
+        self.path = path
+        self.pool = ConnectionPool(path, pool_size)
+        self._ready = False
+        self._ready_lock = threading.Lock()
+        self._listeners = []
+
+    def ensure_schema(self):
+        """Checks the database once per process, creating it if missing and adding any missing index."""
+        if self._ready:
+            return
+        with self._ready_lock:
+            if self._ready:
+                return
+            if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+                logger.warning(f"DB file missing or empty at {self.path}. Initializing...")
+                self._init_db()
+            with self.pool.connection() as conn:
+                found = conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='users'").fetchone()
+            if not found:
+                logger.warning("DB exists but 'users' table missing. Initializing...")
+                self._init_db()
+            with self.pool.connection() as conn:
+                ensure_indexes(conn)
+            self._ready = True
+            logger.info(f"User database ready at {self.path}.")
+
+    def _init_db(self):
+        # Non-destructive: creates whatever is missing and keeps existing customers
+        self.pool.close_all()
+        init_db(self.path)
+
+    def find_user(self, identifiers):
+        """
+        Looks up all candidate identifiers in one indexed query (exact username, or e-mail ignoring
+        case) and returns the profile dict matching the earliest candidate, or None.
+        """
+        candidates = [c for c in identifiers if c]
+        if not candidates:
+            return None
+        self.ensure_schema()
+        marks = ", ".join("?" * len(candidates))
+        sql = f"{_SELECT} WHERE username IN ({marks}) OR (email COLLATE NOCASE) IN ({marks})"
+        with self.pool.connection() as conn:
+            rows = conn.execute(sql, candidates + candidates).fetchall()
+        if not rows:
+            return None
+        profiles = [dict(zip(USER_COLUMNS, row)) for row in rows]
+        for candidate in candidates:
+            for profile in profiles:
+                if profile["username"] == candidate or (profile["email"] or "").lower() == candidate.lower():
+                    return profile
+        return profiles[0]
+
+    def add_listener(self, listener):
+        """listener(username) is called after that customer's row changes, e.g. to drop cached copies."""
+        self._listeners.append(listener)
+
+    def update_user(self, username, **fields):
+        """Updates account or billing fields of one customer. Returns whether the customer exists."""
+        unknown = set(fields) - set(USER_COLUMNS[1:])
+        if unknown:
+            raise ValueError(f"Unknown user fields: {', '.join(sorted(unknown))}")
+        if not fields:
+            return False
+        self.ensure_schema()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self.pool.connection() as conn:
+            with conn:
+                updated = conn.execute(
+                    f"UPDATE users SET {assignments} WHERE username = ?", list(fields.values()) + [username]
+                ).rowcount
+        if updated:
+            for listener in self._listeners:
+                listener(username)
+        return bool(updated)
+
+
+user_store = UserStore()
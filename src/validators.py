@@ -0,0 +1,108 @@
+import ast
+import re
+from datetime import datetime
+
+CLOSE_TOKEN = "[CLOSE_CHAT]"
+
+PROFILE_RE = re.compile(r"\{[^{}]*'username'[^{}]*\}")
+ASKED_PRICE_RE = re.compile(r"\b(price|cost|costs|pay|paying|bill|billed|charge|charged|amount|due|dues|owe|balance|fee)s?\b", re.IGNORECASE)
+ASKED_DATE_RE = re.compile(r"\b(date|when|renew(al)?|expir(e|y|ation)|end|start(ed)?|next bill(ing)?|cycle|contract)\b", re.IGNORECASE)
+ASKED_ADDRESS_RE = re.compile(r"\b(address|where|location|live|lives|installed)\b", re.IGNORECASE)
+SIGNATURE_RE = re.compile(
+    r"(warm regards|best regards|kind regards|sincerely|best wishes|^best,|pulse telecom support team)",
+    re.IGNORECASE | re.MULTILINE,
+)
+# Agent scaffolding that must never reach the customer
+LEAK_RE = re.compile(r"^\s*(approved\.?|final answer:|thought:|action( input)?:|category:)", re.IGNORECASE | re.MULTILINE)
+
+
+def extract_profile(text):
+    """Finds the customer profile dict the User Details Tool returned inside agent output."""
+    if not text:
+        return None
+    match = PROFILE_RE.search(str(text))
+    if not match:
+        return None
+    try:
+        profile = ast.literal_eval(match.group(0))
+    except (ValueError, SyntaxError):
+        return None
+    return profile if isinstance(profile, dict) else None
+
+
+def _date_forms(value):
+    forms = {value}
+    try:
+        parsed = datetime.strptime(value, "%Y-%m-%d")
+    except (TypeError, ValueError):
+        return forms
+    forms.update({
+        parsed.strftime("%B %d, %Y"),
+        f"{parsed.strftime('%B')} {parsed.day}, {parsed.year}",
+        f"{parsed.day} {parsed.strftime('%B')} {parsed.year}",
+        parsed.strftime("%m/%d/%Y"),
+    })
+    return forms
+
+
+def check_privacy(response, profile, user_message):
+    """Account details (price, dates, address) may only appear when the customer asked for them."""
+    if not profile:
+        return []
+    issues = []
+    lowered = response.lower()
+    if not ASKED_PRICE_RE.search(user_message):
+        for field in ("monthly_cost", "dues"):
+            value = profile.get(field)
+            if isinstance(value, (int, float)) and value and f"{value:.2f}" in response:
+                issues.append(f"reveals the customer's {field.replace('_', ' ')} without being asked")
+    if not ASKED_DATE_RE.search(user_message):
+        for field in ("start_date", "end_date", "next_billing_date"):
+            value = profile.get(field)
+            if value and any(form.lower() in lowered for form in _date_forms(value)):
+                issues.append(f"reveals the customer's {field.replace('_', ' ')} without being asked")
+    if not ASKED_ADDRESS_RE.search(user_message):
+        street = str(profile.get("address") or "").split(",")[0].strip().lower()
+        if street and street in lowered:
+            issues.append("reveals the customer's address without being asked")
+    return issues
+
+
+def check_tone(response, closing):
+    issues = []
+    if not response.strip():
+        issues.append("response is empty")
+    if LEAK_RE.search(response):
+        issues.append("contains internal agent output instead of a customer-facing reply")
+    if not closing and SIGNATURE_RE.search(response):
+        issues.append("adds a sign-off signature although the conversation is not ending")
+    letters = [c for c in response if c.isalpha()]
+    if len(letters) > 20 and sum(c.isupper() for c in letters) / len(letters) > 0.6:
+        issues.append("reads as shouting (mostly upper case)")
+    return issues
+
+
+def normalize_close_token(response):
+    """The [CLOSE_CHAT] token may only appear once, at the very end. Fixed locally, no LLM needed."""
+    if CLOSE_TOKEN not in response:
+        return response
+    text = re.sub(r"\s*" + re.escape(CLOSE_TOKEN) + r"\s*", " ", response).strip()
+    return f"{text} {CLOSE_TOKEN}"
+
+
+def visible_text(partial):
+    """
+    What of a partially streamed response can be shown: the [CLOSE_CHAT] token is removed, and a
+    trailing fragment that may be the start of it is held back until the next chunk decides.
+    """
+    text = partial.replace(CLOSE_TOKEN, "")
+    for size in range(len(CLOSE_TOKEN) - 1, 0, -1):
+        if text.endswith(CLOSE_TOKEN[:size]):
+            return text[:-size].rstrip()
+    return text.rstrip()
+
+
+def validate_response(response, profile, user_message):
+    """Runs every local compliance and tone check. Returns a list of issues (empty = compliant)."""
+    closing = CLOSE_TOKEN in response
+    return check_privacy(response, profile, user_message) + check_tone(response, closing)
@@ -0,0 +1,190 @@
+import os
+import pickle
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from src.embedding_pipeline import embed_documents
+from src.logger import setup_logging
+
+logger = setup_logging()
+
+# "flat" (exact, default), "ivf" (inverted lists), "hnsw" (graph) or "pq" (inverted lists of
+# product-quantized codes, the smallest in RAM). Approximate indexes trade some recall for speed.
+INDEX_TYPE = os.environ.get("KB_INDEX_TYPE", "flat").lower()
+IVF_NLIST = int(os.environ.get("KB_IVF_NLIST", "0"))  # 0 picks ~4*sqrt(chunks)
+IVF_NPROBE = int(os.environ.get("KB_IVF_NPROBE", "16"))
+HNSW_M = int(os.environ.get("KB_HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.environ.get("KB_HNSW_EF_CONSTRUCTION", "80"))
+HNSW_EF_SEARCH = int(os.environ.get("KB_HNSW_EF_SEARCH", "64"))
+PQ_M = int(os.environ.get("KB_PQ_M", "16"))  # sub-quantizers; each vector is stored in PQ_M * PQ_BITS bits
+PQ_BITS = int(os.environ.get("KB_PQ_BITS", "8"))
+# Map the persisted index read-only instead of reading it into RAM. faiss only loads the inverted
+# lists of IVF and PQ indexes on demand; flat and HNSW indexes are read in full either way, and every
+# refresh then re-reads a writable copy. "auto" (default) maps IVF and PQ indexes only.
+INDEX_MMAP_SETTING = os.environ.get("KB_INDEX_MMAP", "auto").lower()
+INDEX_MMAP = INDEX_TYPE in ("ivf", "pq") if INDEX_MMAP_SETTING == "auto" else INDEX_MMAP_SETTING in ("1", "true", "yes")
+
+INDEX_TYPES = ("flat", "ivf", "hnsw", "pq")
+# faiss wants ~39 training points per centroid
+POINTS_PER_CENTROID = 39
+
+
+def index_settings(index_type=INDEX_TYPE):
+    """Build-time parameters; they are part of the index manifest, so changing them rebuilds the index."""
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown KB_INDEX_TYPE '{index_type}'. Use one of: {', '.join(INDEX_TYPES)}.")
+    settings = {"index_type": index_type}
+    if index_type in ("ivf", "pq"):
+        settings["ivf_nlist"] = IVF_NLIST
+    if index_type == "hnsw":
+        settings.update({"hnsw_m": HNSW_M, "hnsw_ef_construction": HNSW_EF_CONSTRUCTION})
+    if index_type == "pq":
+        settings.update({"pq_m": PQ_M, "pq_bits": PQ_BITS})
+    return settings
+
+
+def _nlist(count):
+    nlist = IVF_NLIST or int(4 * count ** 0.5)
+    return max(1, min(nlist, count // POINTS_PER_CENTROID))
+
+
+def _pq_m(dim):
+    # The vector must split evenly into sub-vectors
+    return max(m for m in range(1, min(PQ_M, dim) + 1) if dim % m == 0)
+
+
+def factory_string(index_type, count, dim):
+    """The faiss index_factory description of an index of this type for `count` vectors."""
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "hnsw":
+        return f"HNSW{HNSW_M}"
+    # Too few vectors to train the centroids (or the 2^bits PQ codebook) falls back to exact search
+    min_points = POINTS_PER_CENTROID * (2 ** PQ_BITS if index_type == "pq" else 1)
+    if count < min_points:
+        return "Flat"
+    if index_type == "ivf":
+        return f"IVF{_nlist(count)},Flat"
+    return f"IVF{_nlist(count)},PQ{_pq_m(dim)}x{PQ_BITS}"
+
+
+def apply_search_params(index):
+    """Sets the recall/speed knobs, which are not persisted with the index."""
+    try:
+        faiss.extract_index_ivf(index).nprobe = IVF_NPROBE
+    except RuntimeError:
+        pass
+    if hasattr(index, "hnsw"):
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+    return index
+
+
+def supports_remove(index):
+    # HNSW cannot remove vectors, and IVF keeps the ids of the remaining ones while the langchain
+    # wrapper renumbers them, so only flat indexes are edited in place
+    return isinstance(index, faiss.IndexFlat)
+
+
+def build_index(matrix, index_type=INDEX_TYPE):
+    """Trains and returns an empty faiss index of the given type sized for the float32 `matrix`."""
+    count, dim = matrix.shape
+    description = factory_string(index_type, count, dim)
+    if description == "Flat" and index_type != "flat":
+        logger.info(f"{count} chunks are too few to train a '{index_type}' index; using exact search.")
+    index = faiss.index_factory(dim, description, faiss.METRIC_L2)
+    if hasattr(index, "hnsw"):
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    if not index.is_trained:
+        index.train(matrix)
+    return apply_search_params(index)
+
+
+def _add(vector_db, documents, vectors, ids):
+    # Adding through the wrapper keeps its docstore (and Document.id) exactly as FAISS.from_embeddings would
+    vector_db.add_embeddings(
+        [(d.page_content, v) for d, v in zip(documents, vectors)],
+        metadatas=[d.metadata for d in documents],
+        ids=list(ids),
+    )
+
+
+def build_vector_store(documents, vectors, ids, embeddings, index_type=INDEX_TYPE):
+    """Builds (and trains, for IVF/PQ) a FAISS vector store of the given type over precomputed vectors."""
+    index = build_index(np.asarray(vectors, dtype=np.float32), index_type)
+    vector_db = FAISS(embeddings, index, InMemoryDocstore(), {})
+    _add(vector_db, documents, vectors, ids)
+    logger.info(f"Built {type(index).__name__} vector index over {index.ntotal} chunks.")
+    return vector_db
+
+
+class VectorStoreBuilder:
+    """
+    Builds a vector store from groups of chunks as they are embedded. Flat and HNSW indexes take
+    each group straight away; IVF and PQ are trained on the whole corpus, so their groups are
+    held (as float32 rows) until finish().
+    """
+
+    def __init__(self, embeddings, index_type=INDEX_TYPE):
+        self.embeddings = embeddings
+        self.index_type = index_type
+        self.vector_db = None
+        self._pending = []
+
+    def add(self, documents, vectors, ids):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.index_type in ("ivf", "pq"):
+            self._pending.append((list(documents), vectors, list(ids)))
+            return
+        if self.vector_db is None:
+            self.vector_db = FAISS(self.embeddings, build_index(vectors, self.index_type), InMemoryDocstore(), {})
+        _add(self.vector_db, documents, vectors, ids)
+
+    def finish(self):
+        """The built vector store, or None if no chunks were added."""
+        if self._pending:
+            documents = [d for group, _, _ in self._pending for d in group]
+            ids = [i for _, _, group in self._pending for i in group]
+            vectors = np.concatenate([group for _, group, _ in self._pending])
+            self._pending = []
+            return build_vector_store(documents, vectors, ids, self.embeddings, self.index_type)
+        if self.vector_db is not None:
+            logger.info(f"Built {type(self.vector_db.index).__name__} vector index over {self.vector_db.index.ntotal} chunks.")
+        return self.vector_db
+
+
+def rebuild_without(vector_db, stale_ids, embeddings, new_documents=(), new_vectors=(), new_ids=()):
+    """
+    A new vector store holding the chunks of vector_db minus stale_ids, plus the new ones, for
+    index types that cannot delete in place. Kept chunks are re-embedded (normally from the
+    embedding cache) rather than reconstructed, since PQ codes only approximate the vectors.
+    """
+    stale = set(stale_ids)
+    kept_ids = [cid for _, cid in sorted(vector_db.index_to_docstore_id.items()) if cid not in stale]
+    kept_docs = [vector_db.docstore.search(cid) for cid in kept_ids]
+    kept_vectors = embed_documents(embeddings, [d.page_content for d in kept_docs]) if kept_docs else []
+    return build_vector_store(
+        kept_docs + list(new_documents), list(kept_vectors) + list(new_vectors), kept_ids + list(new_ids), embeddings,
+    )
+
+
+def load_vector_store(index_dir, embeddings, mmap=INDEX_MMAP):
+    """Loads a store written by FAISS.save_local, memory-mapping the index file when mmap is set."""
+    path = os.path.join(index_dir, "index.faiss")
+    flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if mmap else 0
+    index = apply_search_params(faiss.read_index(path, flags))
+    # The docstore pickle is written by save_index, never taken from user input
+    with open(os.path.join(index_dir, "index.pkl"), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    vector_db = FAISS(embeddings, index, docstore, index_to_docstore_id)
+    vector_db.index_path = path if mmap else None
+    return vector_db
+
+
+def writable(vector_db):
+    """vector_db itself, or a copy read fully into RAM if its index is memory-mapped (read-only)."""
+    path = getattr(vector_db, "index_path", None)
+    if not path:
+        return vector_db
+    index = apply_search_params(faiss.read_index(path))
+    return FAISS(vector_db.embedding_function, index, vector_db.docstore, vector_db.index_to_docstore_id)
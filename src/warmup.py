@@ -0,0 +1,57 @@
+import os
+import threading
+import time
+from src.logger import setup_logging
+from src.metrics import register_readiness
+
+logger = setup_logging()
+
+# Crew pipelines built ahead of the first request, comma-separated; empty skips it
+WARMUP_PIPELINES = [p for p in os.environ.get("WARMUP_PIPELINES", "five_stage").split(",") if p.strip()]
+
+_state = {"ready": False, "status": "cold", "seconds": None, "error": None}
+_started = None
+_thread = None
+_lock = threading.Lock()
+
+
+def readiness():
+    """Whether the crew modules (crewai, litellm, langchain, faiss) are imported and requests can run."""
+    return dict(_state)
+
+
+def _run():
+    try:
+        _state["status"] = "importing"
+        # The heavy imports app.py defers; they also register the knowledge_base readiness check
+        from src.crew_pool import crew_pool
+        from src.tools import PolicyKnowledgeBase
+        import src.crew  # noqa: F401
+        import src.response_cache  # noqa: F401
+        _state.update(ready=True, status="ready", seconds=round(time.perf_counter() - _started, 3))
+        logger.info(f"Application modules imported in {_state['seconds']:.1f}s after start-up.")
+
+        thread = PolicyKnowledgeBase.warm_up()
+        if thread is not None:
+            thread.join()
+        for pipeline in WARMUP_PIPELINES:
+            crew_pool.warm_up((pipeline.strip(),))
+        logger.info(f"Warm-up finished {time.perf_counter() - _started:.1f}s after start-up.")
+    except Exception as e:
+        if not _state["ready"]:
+            _state.update(status="failed", error=str(e))
+        logger.error(f"Error during start-up warm-up: {e}")
+
+
+def start():
+    """Imports the crew modules, loads the knowledge base and pre-builds crews on a background thread."""
+    global _started, _thread
+    with _lock:
+        if _thread is None:
+            _started = time.perf_counter()
+            _thread = threading.Thread(target=_run, name="app-warmup", daemon=True)
+            _thread.start()
+        return _thread
+
+
+register_readiness("app", readiness)